@@ -0,0 +1,36 @@
+"""News feed keyset index
+
+Revision ID: 3c1f7a9d2b64
+Revises: 90a3d95b9b36
+Create Date: 2026-10-18 10:12:31.418204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f7a9d2b64'
+down_revision: Union[str, Sequence[str], None] = '90a3d95b9b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # курсор ленты строится по (publication_date, news_id), поэтому дата публикации обязательна
+    op.execute("UPDATE news SET publication_date = now() WHERE publication_date IS NULL")
+    op.alter_column('news', 'publication_date',
+               existing_type=sa.DateTime(timezone=True),
+               nullable=False)
+    op.create_index('ix_news_publication_date_news_id', 'news', ['publication_date', 'news_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_news_publication_date_news_id', table_name='news')
+    op.alter_column('news', 'publication_date',
+               existing_type=sa.DateTime(timezone=True),
+               nullable=True)
@@ -0,0 +1,31 @@
+"""Add updated_at
+
+Revision ID: 7e2a5c8f1d03
+Revises: 3c1f7a9d2b64
+Create Date: 2026-10-18 11:40:05.127733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2a5c8f1d03'
+down_revision: Union[str, Sequence[str], None] = '3c1f7a9d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # время последнего изменения строки для ETag / Last-Modified
+    for table in ('news', 'comment', 'user'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('user', 'comment', 'news'):
+        op.drop_column(table, 'updated_at')
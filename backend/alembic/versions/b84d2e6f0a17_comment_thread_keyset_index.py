@@ -0,0 +1,36 @@
+"""Comment thread keyset index
+
+Revision ID: b84d2e6f0a17
+Revises: 7e2a5c8f1d03
+Create Date: 2026-10-18 12:25:47.603918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b84d2e6f0a17'
+down_revision: Union[str, Sequence[str], None] = '7e2a5c8f1d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # курсор ветки комментариев строится по (publication_date, comment_id), поэтому дата публикации обязательна
+    op.execute("UPDATE comment SET publication_date = now() WHERE publication_date IS NULL")
+    op.alter_column('comment', 'publication_date',
+               existing_type=sa.DateTime(timezone=True),
+               nullable=False)
+    op.create_index('ix_comment_news_id_publication_date_comment_id', 'comment', ['news_id', 'publication_date', 'comment_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comment_news_id_publication_date_comment_id', table_name='comment')
+    op.alter_column('comment', 'publication_date',
+               existing_type=sa.DateTime(timezone=True),
+               nullable=True)
@@ -0,0 +1,36 @@
+"""News comment count
+
+Revision ID: c51a9e3b7d42
+Revises: b84d2e6f0a17
+Create Date: 2026-10-18 13:02:19.384516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51a9e3b7d42'
+down_revision: Union[str, Sequence[str], None] = 'b84d2e6f0a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # денормализованное число комментариев новости
+    op.add_column('news', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE news SET comment_count = counts.total "
+        "FROM (SELECT news_id, count(*) AS total FROM comment GROUP BY news_id) AS counts "
+        "WHERE news.news_id = counts.news_id"
+    )
+    op.create_index('ix_news_comment_count_news_id', 'news', ['comment_count', 'news_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_news_comment_count_news_id', table_name='news')
+    op.drop_column('news', 'comment_count')
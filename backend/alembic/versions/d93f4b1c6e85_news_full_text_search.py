@@ -0,0 +1,68 @@
+"""News full-text search
+
+Revision ID: d93f4b1c6e85
+Revises: c51a9e3b7d42
+Create Date: 2026-10-18 13:48:02.571390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd93f4b1c6e85'
+down_revision: Union[str, Sequence[str], None] = 'c51a9e3b7d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('news', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    # вектор строится из заголовка (вес A) и текста блоков paragraph/header из content (вес B, без html-разметки).
+    # content хранится как JSON, поэтому вектор поддерживается триггером, а не генерируемым столбцом
+    op.execute(
+        '''
+            CREATE FUNCTION news_search_vector_update() RETURNS trigger AS $$
+            DECLARE
+                blocks json := CASE json_typeof(NEW.content)
+                    WHEN 'array' THEN NEW.content
+                    WHEN 'object' THEN NEW.content -> 'blocks'
+                END;
+                body text;
+            BEGIN
+                IF json_typeof(blocks) = 'array' THEN
+                    SELECT string_agg(regexp_replace(coalesce(block ->> 'text', block -> 'data' ->> 'text'), '<[^>]*>', ' ', 'g'), ' ')
+                    INTO body
+                    FROM json_array_elements(blocks) AS block
+                    WHERE json_typeof(block) = 'object' AND block ->> 'type' IN ('paragraph', 'header');
+                END IF;
+                NEW.search_vector :=
+                    setweight(to_tsvector('russian', coalesce(NEW.header, '')), 'A') ||
+                    setweight(to_tsvector('russian', coalesce(body, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        '''
+    )
+    op.execute(
+        '''
+            CREATE TRIGGER news_search_vector_update
+            BEFORE INSERT OR UPDATE OF header, content ON news
+            FOR EACH ROW EXECUTE FUNCTION news_search_vector_update()
+        '''
+    )
+    # заполнение вектора для существующих новостей
+    op.execute("UPDATE news SET header = header")
+    op.create_index('ix_news_search_vector', 'news', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_news_search_vector', table_name='news', postgresql_using='gin')
+    op.execute("DROP TRIGGER news_search_vector_update ON news")
+    op.execute("DROP FUNCTION news_search_vector_update()")
+    op.drop_column('news', 'search_vector')
@@ -0,0 +1,31 @@
+"""Author indexes
+
+Revision ID: e2b7c0d5a913
+Revises: d93f4b1c6e85
+Create Date: 2026-10-18 14:21:36.905127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c0d5a913'
+down_revision: Union[str, Sequence[str], None] = 'd93f4b1c6e85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # лента автора (keyset по (publication_date, news_id)) и проверка внешних ключей при удалении пользователя
+    op.create_index('ix_news_author_id_publication_date_news_id', 'news', ['author_id', 'publication_date', 'news_id'], unique=False)
+    op.create_index('ix_comment_author_id', 'comment', ['author_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comment_author_id', table_name='comment')
+    op.drop_index('ix_news_author_id_publication_date_news_id', table_name='news')
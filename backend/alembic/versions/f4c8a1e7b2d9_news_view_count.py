@@ -0,0 +1,29 @@
+"""News view count
+
+Revision ID: f4c8a1e7b2d9
+Revises: e2b7c0d5a913
+Create Date: 2026-10-18 16:05:42.118307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c8a1e7b2d9'
+down_revision: Union[str, Sequence[str], None] = 'e2b7c0d5a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # число просмотров новости; накапливается в Redis и периодически переносится сюда пачками
+    op.add_column('news', sa.Column('view_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('news', 'view_count')
@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+
+
+class PoolWaitRead(BaseModel):
+    acquired: int
+    failures: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+class DatabasePoolRead(PoolWaitRead):
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    max_overflow: int
+
+class RedisPoolRead(PoolWaitRead):
+    max_connections: int
+    checked_out: int
+    idle: int
+
+class PasswordHashPoolRead(BaseModel):
+    workers: int
+    executor: str
+    waiting: int
+    running: int
+    completed: int
+    rejected: int
+
+class StatsRead(BaseModel):
+    users: int
+    news: int
+    comments: int
+
+class PoolsRead(BaseModel):
+    database: DatabasePoolRead
+    replicas: dict[str, DatabasePoolRead]
+    redis: RedisPoolRead
+    redis_cache: RedisPoolRead
+    password_hash: PasswordHashPoolRead
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
+
+from app.comment.models import Comment
+from app.database import engine, redis_client, redis_cache_client
+from app.depends import is_admin
+from app.hashing import password_hash_pool
+from app.news.models import News
+from app.replica import REPLICA_HOSTS, ReadSessionDep, replica_engines
+from app.user.models import User
+from .schemas import PoolsRead, StatsRead
+
+router = APIRouter(tags=["admin"], default_response_class=ORJSONResponse)
+
+# общее число пользователей, новостей и комментариев (одним запросом)
+@router.get("/stats", response_model=StatsRead)
+async def get_stats(db: ReadSessionDep, _ = Depends(is_admin)):
+    counts = await db.execute(select(
+        select(func.count()).select_from(User).scalar_subquery().label("users"),
+        select(func.count()).select_from(News).scalar_subquery().label("news"),
+        select(func.count()).select_from(Comment).scalar_subquery().label("comments"),
+    ))
+    return StatsRead(**counts.mappings().one())
+
+# состояние пулов соединений текущего воркера (для подбора размеров пулов под число воркеров)
+@router.get("/pools", response_model=PoolsRead)
+async def get_pools(_ = Depends(is_admin)):
+    return PoolsRead(
+        database=engine.pool.stats(),
+        replicas={host: replica_engine.pool.stats() for host, replica_engine in zip(REPLICA_HOSTS, replica_engines)},
+        redis=redis_client.connection_pool.stats(),
+        redis_cache=redis_cache_client.connection_pool.stats(),
+        password_hash=password_hash_pool.stats(),
+    )
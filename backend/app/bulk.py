@@ -0,0 +1,120 @@
+import os
+from typing import AsyncIterator, Awaitable, Callable
+
+from dotenv import load_dotenv
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+load_dotenv()
+# число строк, вставляемых одним запросом в одной транзакции при пакетной загрузке
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 500))
+# сколько ошибок с номерами строк возвращается в ответе (общее число ошибок считается всегда)
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", 100))
+
+# описание тела запроса для Swagger: строки JSON, разделённые переводом строки
+NDJSON_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+    }
+}
+
+
+class BulkError(BaseModel):
+    line: int
+    detail: str
+
+class BulkResult(BaseModel):
+    inserted: int = 0
+    error_count: int = 0
+    errors: list[BulkError] = []
+
+    # учёт ошибочной строки: подробности сохраняются только для первых BULK_MAX_ERRORS,
+    # чтобы ответ на загрузку с массовыми ошибками не рос вместе с телом запроса
+    def add_error(self, line: int, detail: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < BULK_MAX_ERRORS:
+            self.errors.append(BulkError(line=line, detail=detail))
+
+
+'''Функция построчного чтения тела запроса в формате NDJSON без загрузки всего тела в память'''
+async def read_ndjson_lines(request: Request) -> AsyncIterator[tuple[int, bytes]]:
+    buffer = b""
+    line_no = 0
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, line
+    if buffer.strip():
+        yield line_no + 1, buffer
+
+'''Функция краткого описания ошибок валидации строки'''
+def validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, err['loc'])) or 'line'}: {err['msg']}" for err in error.errors()
+    )
+
+'''Функция вставки пачки строк: сначала целиком в одном savepoint, а если пачка не вставилась —
+по одной строке, чтобы ошибка одной строки не отменяла остальные'''
+async def _insert_batch(
+    db: AsyncSession,
+    batch: list[tuple[int, dict]],
+    insert_rows: Callable[[list[dict]], Awaitable[None]],
+    result: BulkResult,
+) -> list[dict]:
+    rows = [row for _, row in batch]
+    try:
+        async with db.begin_nested():
+            await insert_rows(rows)
+        return rows
+    except DBAPIError:
+        pass
+    inserted = []
+    for line_no, row in batch:
+        try:
+            async with db.begin_nested():
+                await insert_rows([row])
+        except DBAPIError as e:
+            result.add_error(line_no, str(e.orig).splitlines()[0])
+        else:
+            inserted.append(row)
+    return inserted
+
+'''Функция пакетной загрузки NDJSON: каждая строка проверяется схемой, валидные строки вставляются
+пачками по batch_size (одна транзакция на пачку), ошибки собираются по номерам строк (не больше BULK_MAX_ERRORS)'''
+async def load_ndjson(
+    db: AsyncSession,
+    request: Request,
+    schema: type[BaseModel],
+    build_row: Callable[[BaseModel], dict],
+    insert_rows: Callable[[list[dict]], Awaitable[None]],
+    after_commit: Callable[[list[dict]], Awaitable[None]] | None = None,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> BulkResult:
+    result = BulkResult()
+    batch: list[tuple[int, dict]] = []
+
+    async def flush() -> None:
+        inserted = await _insert_batch(db, batch, insert_rows, result)
+        await db.commit()
+        result.inserted += len(inserted)
+        if inserted and after_commit is not None:
+            await after_commit(inserted)
+        batch.clear()
+
+    async for line_no, line in read_ndjson_lines(request):
+        try:
+            payload = schema.model_validate_json(line)
+        except ValidationError as e:
+            result.add_error(line_no, validation_detail(e))
+            continue
+        batch.append((line_no, build_row(payload)))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return result
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, NamedTuple
+
+from dotenv import load_dotenv
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+from app.database import redis_cache_client
+from app.metrics import CACHE_FILL_COALESCED
+from app.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+# время жизни закэшированного ответа в секундах
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 60))
+# блокировка заполнения ключа между воркерами в миллисекундах (0 — только объединение запросов внутри воркера)
+CACHE_FILL_LOCK_MS = int(os.getenv("CACHE_FILL_LOCK_MS", 0))
+# как часто воркер, ожидающий заполнения ключа другим воркером, проверяет кэш
+CACHE_FILL_POLL_MS = int(os.getenv("CACHE_FILL_POLL_MS", 20))
+
+# ключи кэша для горячих чтений
+def news_cache_key(news_id: int) -> str:
+    return f"cache:news:{news_id}"
+
+def comments_cache_key(news_id: int, order: str, limit: int) -> str:
+    return f"cache:comments:{news_id}:{order}:{limit}"
+
+# блокировка заполнения ключа кэша одним воркером
+def fill_lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+# тег объединяет все закэшированные страницы комментариев новости, чтобы сбрасывать их разом
+def comments_cache_tag(news_id: int) -> str:
+    return f"cache:tag:comments:{news_id}"
+
+# удаление всех ключей тега и самого тега за один запрос к Redis
+INVALIDATE_TAG_LUA = """
+local keys = redis.call('SMEMBERS', KEYS[1])
+for i = 1, #keys, 1000 do
+    redis.call('UNLINK', unpack(keys, i, math.min(i + 999, #keys)))
+end
+redis.call('UNLINK', KEYS[1])
+return #keys
+"""
+
+# снятие блокировки заполнения, только если она всё ещё принадлежит этому воркеру
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# добавление сжатого тела только к ещё существующему ответу (иначе ключ мог бы пережить инвалидацию без TTL)
+SET_ENCODED_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+return 0
+"""
+
+
+# закэшированный ответ: тело, заголовки-валидаторы (ETag, Last-Modified)
+# и, если запрошено, тело, сжатое в нужной кодировке
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: dict[str, str]
+    encoded: bytes | None = None
+
+
+# read-through кэш сериализованных JSON-ответов в Redis (хэш: тело, заголовки и сжатые тела body:<кодировка>).
+# Недоступность Redis не ломает чтение: запрос просто уходит в базу данных
+class ResponseCache:
+    def __init__(self, redis: AsyncRedis, ttl: int, fill_lock_ms: int = 0, fill_poll_ms: int = 20):
+        self.redis = redis
+        self.ttl = ttl
+        self.fill_lock_ms = fill_lock_ms
+        self.fill_poll_ms = fill_poll_ms
+        self._flights = SingleFlight()
+        self._invalidate_tag = redis.register_script(INVALIDATE_TAG_LUA)
+        self._set_encoded = redis.register_script(SET_ENCODED_LUA)
+        self._release_lock = redis.register_script(RELEASE_LOCK_LUA)
+
+    # получение готового ответа (и его сжатого тела в кодировке encoding, если оно уже есть); None при промахе
+    async def get(self, key: str, encoding: str | None = None) -> CachedResponse | None:
+        fields = ["body", "headers"] + ([f"body:{encoding}"] if encoding else [])
+        try:
+            values = await self.redis.hmget(key, fields)
+        except RedisError as e:
+            logger.warning("Response cache read failed for %s: %s", key, e)
+            return None
+        if values[0] is None or values[1] is None:
+            return None
+        return CachedResponse(values[0], json.loads(values[1]), values[2] if encoding else None)
+
+    # сохранение готового ответа (при указании тега ключ добавляется в его множество)
+    async def set(self, key: str, body: bytes, headers: dict[str, str], tag: str | None = None) -> None:
+        mapping = {"body": body, "headers": json.dumps(headers)}
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self.ttl)
+                if tag is not None:
+                    pipe.sadd(tag, key)
+                    pipe.expire(tag, self.ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Response cache write failed for %s: %s", key, e)
+
+    # заполнение кэша при промахе: одновременные промахи по ключу в воркере ждут одну загрузку loader()
+    # и получают её ответ, а с блокировкой (fill_lock_ms > 0) ключ загружает один воркер, остальные ждут ответ в кэше
+    async def fill(self, key: str, loader: Callable[[], Awaitable[CachedResponse]], tag: str | None = None) -> CachedResponse:
+        cached, shared = await self._flights.do(key, lambda: self._fill(key, loader, tag))
+        if shared:
+            CACHE_FILL_COALESCED.labels("worker").inc()
+        return cached
+
+    async def _fill(self, key: str, loader: Callable[[], Awaitable[CachedResponse]], tag: str | None) -> CachedResponse:
+        token = uuid.uuid4().hex
+        if self.fill_lock_ms and not await self._lock(key, token):
+            cached = await self._wait_fill(key)
+            if cached is not None:
+                CACHE_FILL_COALESCED.labels("redis").inc()
+                return cached
+        try:
+            cached = await loader()
+            await self.set(key, cached.body, cached.headers, tag)
+            return cached
+        finally:
+            if self.fill_lock_ms:
+                await self._unlock(key, token)
+
+    # захват блокировки заполнения; False — ключ уже заполняет другой воркер (при недоступности Redis — True)
+    async def _lock(self, key: str, token: str) -> bool:
+        try:
+            return bool(await self.redis.set(fill_lock_key(key), token, nx=True, px=self.fill_lock_ms))
+        except RedisError as e:
+            logger.warning("Cache fill lock failed for %s: %s", key, e)
+            return True
+
+    async def _unlock(self, key: str, token: str) -> None:
+        try:
+            await self._release_lock(keys=[fill_lock_key(key)], args=[token])
+        except RedisError as e:
+            logger.warning("Cache fill unlock failed for %s: %s", key, e)
+
+    # ожидание ответа, который загружает другой воркер; None, если блокировка снята без ответа
+    # (например, новость не найдена) или истекла — тогда ключ загружается самостоятельно
+    async def _wait_fill(self, key: str) -> CachedResponse | None:
+        deadline = time.monotonic() + self.fill_lock_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.fill_poll_ms / 1000)
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.hmget(key, ["body", "headers"])
+                    pipe.exists(fill_lock_key(key))
+                    (body, headers), locked = await pipe.execute()
+            except RedisError as e:
+                logger.warning("Cache fill wait failed for %s: %s", key, e)
+                return None
+            if body is not None and headers is not None:
+                return CachedResponse(body, json.loads(headers))
+            if not locked:
+                return None
+        return None
+
+    # сохранение сжатого тела рядом с уже закэшированным ответом
+    async def set_encoded(self, key: str, encoding: str, body: bytes) -> None:
+        try:
+            await self._set_encoded(keys=[key], args=[f"body:{encoding}", body])
+        except RedisError as e:
+            logger.warning("Response cache write failed for %s: %s", key, e)
+
+    # сброс кэша после изменения данных
+    async def invalidate(self, *keys: str) -> None:
+        try:
+            await self.redis.unlink(*keys)
+        except RedisError as e:
+            logger.warning("Response cache invalidation failed for %s: %s", keys, e)
+
+    # сброс всех ответов, закэшированных под тегом
+    async def invalidate_tag(self, tag: str) -> None:
+        try:
+            await self._invalidate_tag(keys=[tag])
+        except RedisError as e:
+            logger.warning("Response cache invalidation failed for tag %s: %s", tag, e)
+
+
+response_cache = ResponseCache(redis_cache_client, RESPONSE_CACHE_TTL, CACHE_FILL_LOCK_MS, CACHE_FILL_POLL_MS)
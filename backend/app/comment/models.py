@@ -1,4 +1,4 @@
-﻿from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+﻿from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.database import Base
@@ -10,7 +10,15 @@ class Comment(Base):
     text = Column(String, nullable=False)
     news_id = Column(Integer, ForeignKey("news.news_id"), nullable=False)
     author_id = Column(Integer, ForeignKey("user.user_id"), nullable=False)
-    publication_date = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    publication_date = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
-    news = relationship("News", back_populates="comment", lazy="subquery")
-    author = relationship("User", back_populates="comment", lazy="subquery")
+    news = relationship("News", back_populates="comment", lazy="raise")
+    author = relationship("User", back_populates="comment", lazy="raise")
+
+    __table_args__ = (
+        # индекс для keyset-пагинации комментариев новости в обоих направлениях
+        Index("ix_comment_news_id_publication_date_comment_id", "news_id", "publication_date", "comment_id"),
+        # индекс для проверки ссылок при удалении пользователя
+        Index("ix_comment_author_id", "author_id"),
+    )
\ No newline at end of file
@@ -1,5 +1,6 @@
 ﻿from pydantic import BaseModel, ConfigDict
 from datetime import datetime
+from typing import Optional
 from app.user.schemas import UserRead
 
 class CommentBase(BaseModel):
@@ -17,4 +18,16 @@ class CommentRead(CommentBase):
     author_id: int
     author: UserRead
     publication_date: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+class CommentPage(BaseModel):
+    items: list[CommentRead]
+    next_cursor: Optional[str] = None
+
+class CommentExport(CommentBase):
+    comment_id: int
+    news_id: int
+    author_id: int
+    publication_date: datetime
+    updated_at: datetime
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
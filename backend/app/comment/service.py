@@ -1,49 +1,245 @@
-﻿from typing import Sequence
-from fastapi import HTTPException, status
-from sqlalchemy import select
+﻿from typing import Literal
+from collections import Counter
+from datetime import datetime, timezone
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Select, RowMapping, select, insert, update, delete, tuple_, bindparam
+from sqlalchemy.orm import joinedload, raiseload
+import hashlib
 
+from app.bulk import BulkResult, load_ndjson
+from app.cache import CachedResponse, response_cache, news_cache_key, comments_cache_key, comments_cache_tag
+from app.compression import cached_json_response, request_encoding
+from app.conditional import validator_headers, is_conditional, is_not_modified, not_modified
 from app.database import SessionDep
+from app.export import ndjson_response
+from app.replica import primary_session
+from app.serialization import nested_columns, nest_row, dump_json
+from app.user.models import User
+from app.user.service import user_read_columns
+from app.utils import encode_cursor, decode_date_id_cursor
+from app.news.models import News
 from .models import Comment
-from .schemas import CommentCreate, CommentUpdate
+from .schemas import CommentCreate, CommentUpdate, CommentRead, CommentPage, CommentExport
+
+CommentOrder = Literal["oldest", "newest"]
+
+comment_page_adapter = TypeAdapter(CommentPage)
+
+'''Функция получения столбцов CommentRead вместе с автором и версиями (updated_at) комментария и автора'''
+def comment_read_columns() -> tuple:
+    return (
+        Comment.comment_id, Comment.text, Comment.news_id, Comment.author_id, Comment.publication_date, Comment.updated_at,
+        *nested_columns("author", *user_read_columns(), User.updated_at),
+    )
+
+'''Функция сериализации страницы комментариев из строк Core-запроса'''
+def comment_page_body(rows, next_cursor: str | None) -> bytes:
+    return dump_json(comment_page_adapter, {"items": [nest_row(row) for row in rows], "next_cursor": next_cursor})
 
 class CommentService:
     def __init__(self, db: SessionDep):
         self.db = db
 
-    # создание комментария
+    # создание комментария: счётчик новости увеличивается в той же транзакции после того, как вставка вернула строку
     async def create(self, payload: CommentCreate, user_id: int) -> Comment:
-        new_comment = Comment(**payload.model_dump(), author_id = user_id)
-        self.db.add(new_comment)
+        inserted = await self.db.execute(
+            insert(Comment).values(**payload.model_dump(), author_id=user_id).returning(Comment.comment_id)
+        )
+        comment_id = inserted.scalar_one()
+        await self._change_comment_count(payload.news_id, 1)
         await self.db.commit()
-        await self.db.refresh(new_comment)
-        return new_comment
+        await self._invalidate(payload.news_id)
+        return await self.get(comment_id)
+
+    # пакетная загрузка комментариев из NDJSON (каждая строка — CommentCreate, автор — загружающий пользователь)
+    async def bulk_create(self, request: Request, user_id: int) -> BulkResult:
+        news_table = News.__table__
+        change_counts = (
+            update(news_table)
+            .where(news_table.c.news_id == bindparam("b_news_id"))
+            .values(comment_count=news_table.c.comment_count + bindparam("b_delta"))
+        )
+
+        async def insert_rows(rows: list[dict]) -> None:
+            await self.db.execute(insert(Comment), rows)
+            # счётчики обновляются в порядке news_id, чтобы параллельные загрузки не блокировали друг друга
+            counts = sorted(Counter(row["news_id"] for row in rows).items())
+            await self.db.execute(change_counts, [{"b_news_id": news_id, "b_delta": delta} for news_id, delta in counts])
+
+        async def after_commit(rows: list[dict]) -> None:
+            for news_id in {row["news_id"] for row in rows}:
+                await self._invalidate(news_id)
+
+        return await load_ndjson(
+            self.db, request, CommentCreate,
+            lambda payload: {**payload.model_dump(), "author_id": user_id},
+            insert_rows, after_commit,
+        )
+
+    # атомарное изменение счётчика комментариев новости в текущей транзакции
+    async def _change_comment_count(self, news_id: int, delta: int) -> None:
+        await self.db.execute(
+            update(News)
+            .where(News.news_id == news_id)
+            .values(comment_count=News.comment_count + delta)
+        )
+
+    # сброс кэша ветки комментариев и самой новости (в ней хранится число комментариев)
+    async def _invalidate(self, news_id: int) -> None:
+        await response_cache.invalidate(news_cache_key(news_id))
+        await response_cache.invalidate_tag(comments_cache_tag(news_id))
     
-    # чтение списка комментариев конкретной новости
-    async def list(self, news_id) -> Sequence[Comment]:
-        comments = await self.db.execute(select(Comment).where(Comment.news_id == news_id))
-        comments_list = comments.scalars().all()
-        if not comments_list:
+    # запрос страницы комментариев новости (keyset-пагинация по (publication_date, comment_id) в заданном порядке)
+    @staticmethod
+    def _page_query(query: Select, news_id: int, order: CommentOrder, limit: int, cursor: str | None) -> Select:
+        key = tuple_(Comment.publication_date, Comment.comment_id)
+        if order == "newest":
+            query = query.order_by(Comment.publication_date.desc(), Comment.comment_id.desc())
+        else:
+            query = query.order_by(Comment.publication_date, Comment.comment_id)
+        if cursor is not None:
+            position = decode_date_id_cursor(cursor)
+            if position is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            query = query.where(key < tuple_(*position) if order == "newest" else key > tuple_(*position))
+        return query.where(Comment.news_id == news_id).limit(limit + 1)
+
+    # заголовки-валидаторы страницы: версия — состав страницы и последнее изменение её комментариев или их авторов.
+    # Только ETag: после удаления комментария время последнего изменения страницы не растёт,
+    # и If-Modified-Since ошибочно получал бы 304
+    @staticmethod
+    def _page_headers(news_id: int, order: CommentOrder, limit: int, cursor: str | None, versions: list[tuple], has_next: bool) -> dict[str, str]:
+        ids = ",".join(str(comment_id) for comment_id, _, _ in versions)
+        page = hashlib.sha1(f"{order}:{limit}:{cursor}:{ids}:{has_next}".encode()).hexdigest()[:16]
+        last_modified = max(
+            (max(comment_version, author_version) for _, comment_version, author_version in versions),
+            default=datetime.fromtimestamp(0, timezone.utc),
+        )
+        return {"ETag": validator_headers("comments", news_id, last_modified, page)["ETag"]}
+
+    # загрузка страницы комментариев вместе с авторами (строками Core-запроса, без ORM-объектов) и курсора следующей страницы
+    async def _fetch_page(self, news_id: int, order: CommentOrder, limit: int, cursor: str | None) -> tuple[list[RowMapping], str | None]:
+        query = select(*comment_read_columns()).join(User, Comment.author_id == User.user_id)
+        comments = await self.db.execute(self._page_query(query, news_id, order, limit, cursor))
+        comments_list = list(comments.mappings().all())
+        if not comments_list and cursor is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No comments found")
-        return comments_list
-    
+        next_cursor = None
+        if len(comments_list) > limit:
+            comments_list = comments_list[:limit]
+            last = comments_list[-1]
+            next_cursor = encode_cursor(last["publication_date"], last["comment_id"])
+        return comments_list, next_cursor
+
+    # заголовки-валидаторы страницы комментариев без загрузки самих комментариев
+    async def list_validators(self, news_id: int, order: CommentOrder, limit: int, cursor: str | None = None) -> dict[str, str]:
+        query = select(Comment.comment_id, Comment.updated_at, User.updated_at).join(User, Comment.author_id == User.user_id)
+        versions = await self.db.execute(self._page_query(query, news_id, order, limit, cursor))
+        versions = versions.all()
+        if not versions and cursor is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No comments found")
+        return self._page_headers(news_id, order, limit, cursor, versions[:limit], len(versions) > limit)
+
+    # загрузка и сериализация страницы комментариев
+    async def _load_page_response(self, news_id: int, order: CommentOrder, limit: int, cursor: str | None) -> CachedResponse:
+        comments_list, next_cursor = await self._fetch_page(news_id, order, limit, cursor)
+        versions = [(row["comment_id"], row["updated_at"], row["author__updated_at"]) for row in comments_list]
+        headers = self._page_headers(news_id, order, limit, cursor, versions, next_cursor is not None)
+        return CachedResponse(comment_page_body(comments_list, next_cursor), headers)
+
+    # загрузка первой страницы для кэша (всегда из основной базы, см. primary_session)
+    async def _load_cached_page_response(self, news_id: int, order: CommentOrder, limit: int) -> CachedResponse:
+        async with primary_session(self.db) as db:
+            return await CommentService(db)._load_page_response(news_id, order, limit, None)
+
+    # чтение страницы комментариев в виде готового JSON-ответа
+    # (первые страницы кэшируются в Redis, одновременные промахи по одной странице ждут одну загрузку
+    # из базы данных, поддерживаются условные запросы)
+    async def list_response(self, news_id: int, order: CommentOrder, limit: int, cursor: str | None, request: Request) -> Response:
+        key = comments_cache_key(news_id, order, limit) if cursor is None else None
+        cached = await response_cache.get(key, request_encoding(request)) if key else None
+        if cached is None:
+            # без кэша условный запрос проверяется по версии, без загрузки и сериализации комментариев
+            if is_conditional(request):
+                headers = await self.list_validators(news_id, order, limit, cursor)
+                if is_not_modified(request, headers):
+                    return not_modified(request, headers)
+            if key:
+                cached = await response_cache.fill(
+                    key, lambda: self._load_cached_page_response(news_id, order, limit), tag=comments_cache_tag(news_id),
+                )
+            else:
+                cached = await self._load_page_response(news_id, order, limit, cursor)
+        elif is_not_modified(request, cached.headers):
+            return not_modified(request, cached.headers)
+        return await cached_json_response(request, cached, key)
+
+    # потоковая выгрузка комментариев в NDJSON (при указании since — только изменённых с этого момента)
+    @staticmethod
+    def export(since: datetime | None = None) -> StreamingResponse:
+        query = select(Comment).options(raiseload("*")).order_by(Comment.comment_id)
+        if since is not None:
+            query = query.where(Comment.updated_at >= since)
+        return ndjson_response(query, CommentExport, "comments.ndjson")
+
     # чтение комментария по индексу
     async def get(self, comment_id: int) -> Comment:
-        comment = await self.db.execute(select(Comment).where(Comment.comment_id == comment_id))
+        comment = await self.db.execute(
+            select(Comment)
+            .options(joinedload(Comment.author), raiseload("*"))
+            .where(Comment.comment_id == comment_id)
+            .execution_options(populate_existing=True)
+        )
         comment = comment.scalar_one_or_none()
         if not comment:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
         return comment
     
+    # заголовки-валидаторы комментария без его загрузки (версия — последнее изменение комментария или его автора)
+    async def get_validators(self, comment_id: int) -> dict[str, str]:
+        result = await self.db.execute(
+            select(Comment.updated_at, User.updated_at)
+            .join(User, Comment.author_id == User.user_id)
+            .where(Comment.comment_id == comment_id)
+        )
+        versions = result.one_or_none()
+        if not versions:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+        return validator_headers("comment", comment_id, max(versions))
+
+    # чтение комментария по индексу в виде JSON-ответа с поддержкой условных запросов
+    async def get_response(self, comment_id: int, request: Request) -> Response:
+        if is_conditional(request):
+            headers = await self.get_validators(comment_id)
+            if is_not_modified(request, headers):
+                return not_modified(request, headers)
+        comment = await self.get(comment_id)
+        headers = validator_headers("comment", comment_id, max(comment.updated_at, comment.author.updated_at))
+        body = CommentRead.model_validate(comment).model_dump_json()
+        return Response(content=body, media_type="application/json", headers=headers)
+
     # обновление комментария
     async def update(self, comment, payload: CommentUpdate) -> Comment:
         for field, value in payload.model_dump(exclude_unset=True).items():
             setattr(comment, field, value)
+        comment_id = comment.comment_id
+        news_id = comment.news_id
         await self.db.commit()
-        await self.db.refresh(comment)
-        return comment
+        await response_cache.invalidate_tag(comments_cache_tag(news_id))
+        return await self.get(comment_id)
     
-    # удаление комментария
+    # удаление комментария; счётчик новости уменьшается, только если строка действительно удалена
+    # (при одновременном удалении одного комментария второй запрос получает 404, а не уменьшает счётчик ещё раз)
     async def delete(self, comment) -> str:
-        await self.db.delete(comment)
+        news_id = comment.news_id
+        deleted = await self.db.execute(
+            delete(Comment).where(Comment.comment_id == comment.comment_id).returning(Comment.comment_id)
+        )
+        if deleted.first() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+        await self._change_comment_count(news_id, -1)
         await self.db.commit()
+        await self._invalidate(news_id)
         return "The comment was successfully deleted"
\ No newline at end of file
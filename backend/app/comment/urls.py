@@ -1,30 +1,51 @@
-﻿from fastapi import APIRouter, Depends
-from .schemas import CommentCreate, CommentRead, CommentUpdate
-from .service import CommentService
+﻿from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from app.bulk import BulkResult, NDJSON_BODY
+from .schemas import CommentCreate, CommentRead, CommentUpdate, CommentPage
+from .service import CommentService, CommentOrder
 from .models import Comment
-from app.depends import get_jwt_payload, same_comment_author_or_admin
+from app.replica import ReadSessionDep
+from app.rate_limit import WRITE_USER_LIMIT, limit_by_user
+from app.depends import get_jwt_payload, is_admin, same_comment_author_or_admin
 
-router = APIRouter(tags=["comments"])
+router = APIRouter(tags=["comments"], default_response_class=ORJSONResponse)
 
 async def comment_service(service: CommentService = Depends()) -> CommentService:
     return service
 
-@router.post("/", response_model=CommentRead)
+# сервис для GET-запросов: сессия на реплике для чтения
+async def comment_reader(db: ReadSessionDep) -> CommentService:
+    return CommentService(db)
+
+# лимит изменяющих запросов пользователя
+write_limit = Depends(limit_by_user("write_user", WRITE_USER_LIMIT))
+
+@router.post("/", response_model=CommentRead, dependencies=[write_limit])
 async def create_comment(payload: CommentCreate, service: CommentService = Depends(comment_service), jwt_payload = Depends(get_jwt_payload)):
     return await service.create(payload, int(jwt_payload["user_id"]))
 
-@router.get("/news/{news_id}", response_model=list[CommentRead])
-async def get_comments(news_id: int, service: CommentService = Depends(comment_service)):
-    return await service.list(news_id)
+@router.post("/bulk", response_model=BulkResult, openapi_extra=NDJSON_BODY, dependencies=[write_limit])
+async def bulk_create_comments(request: Request, service: CommentService = Depends(comment_service), jwt_payload = Depends(get_jwt_payload), _ = Depends(is_admin)):
+    return await service.bulk_create(request, int(jwt_payload["user_id"]))
+
+@router.get("/news/{news_id}", response_model=CommentPage)
+async def get_comments(news_id: int, request: Request, order: CommentOrder = "oldest", limit: int = Query(50, ge=1, le=100), cursor: Optional[str] = None, service: CommentService = Depends(comment_reader)):
+    return await service.list_response(news_id, order, limit, cursor, request)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_comments(since: Optional[datetime] = None, _ = Depends(is_admin)):
+    return CommentService.export(since)
 
 @router.get("/{comment_id}", response_model=CommentRead)
-async def get_comment_by_id(comment_id: int, service: CommentService = Depends(comment_service)):
-    return await service.get(comment_id)
+async def get_comment_by_id(comment_id: int, request: Request, service: CommentService = Depends(comment_reader)):
+    return await service.get_response(comment_id, request)
 
-@router.put("/{comment_id}", response_model=CommentRead)
+@router.put("/{comment_id}", response_model=CommentRead, dependencies=[write_limit])
 async def update_comment(comment_id: int, payload: CommentUpdate, service: CommentService = Depends(comment_service), comment: Comment = Depends(same_comment_author_or_admin)):
     return await service.update(comment, payload)
 
-@router.delete("/{comment_id}", response_model=str)
+@router.delete("/{comment_id}", response_model=str, dependencies=[write_limit])
 async def delete_comment(comment_id: int, service: CommentService = Depends(comment_service), comment: Comment = Depends(same_comment_author_or_admin)):
     return await service.delete(comment)
\ No newline at end of file
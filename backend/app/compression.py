@@ -0,0 +1,158 @@
+import gzip
+import os
+import zlib
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import CachedResponse, response_cache
+from app.conditional import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # без пакета Brotli ответы сжимаются только gzip
+    brotli = None
+
+load_dotenv()
+# ответы меньше этого размера (в байтах) не сжимаются
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+
+# кодировки в порядке предпочтения сервера
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "text/", "image/svg+xml")
+
+'''Функция выбора кодировки по заголовку Accept-Encoding (с учётом q-значений); None — без сжатия'''
+def choose_encoding(accept_encoding: str) -> str | None:
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+'''Функция выбора кодировки для запроса'''
+def request_encoding(request: Request) -> str | None:
+    return choose_encoding(request.headers.get("accept-encoding", ""))
+
+'''Функция сжатия тела ответа целиком'''
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+'''Функция проверки, имеет ли смысл сжимать ответ с таким Content-Type'''
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+'''Функция построения JSON-ответа из кэша: сжатое тело берётся из кэша, а при его отсутствии
+сжимается один раз и сохраняется рядом с несжатым (key=None — ответ не кэшируется)'''
+async def cached_json_response(request: Request, cached: CachedResponse, key: str | None) -> Response:
+    headers = {**cached.headers, "Vary": "Accept-Encoding"}
+    encoding = request_encoding(request)
+    if encoding is None or len(cached.body) < COMPRESSION_MIN_SIZE:
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+    body = cached.encoded
+    if body is None:
+        body = compress(cached.body, encoding)
+        if key is not None:
+            await response_cache.set_encoded(key, encoding, body)
+    headers["Content-Encoding"] = encoding
+    headers["ETag"] = encoded_etag(headers["ETag"], encoding)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# потоковый компрессор для ответов, отдаваемых частями (например, NDJSON-выгрузки)
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.encoding = encoding
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish() if self.encoding == "br" else self._compressor.flush()
+
+
+# ASGI-middleware сжатия всех остальных ответов: небольшие и уже сжатые ответы (например, из кэша)
+# отдаются как есть, потоковые ответы сжимаются по частям
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: _StreamCompressor | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if compressor is not None:
+                chunk = compressor.compress(body) if body else b""
+                if not more_body:
+                    chunk += compressor.finish()
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            if (
+                "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            # у сжатого представления свой ETag, отличный от несжатого
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["ETag"], encoding)
+            if not more_body:
+                body = compress(body, encoding)
+                headers["Content-Length"] = str(len(body))
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            compressor = _StreamCompressor(encoding)
+            await send(start)
+            await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+
+        await self.app(scope, receive, send_compressed)
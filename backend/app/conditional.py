@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+# суффиксы ETag сжатых представлений: у разных кодировок одного ресурса разные сильные ETag ("news-1-...-br")
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+'''Функция построения заголовков-валидаторов ответа: сильный ETag по виду сущности,
+её ключу и версии (времени последнего изменения) и Last-Modified'''
+def validator_headers(kind: str, key, last_modified: datetime, *extra) -> dict[str, str]:
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    version = "-".join([str(key), *map(str, extra), str(int(last_modified.timestamp() * 1_000_000))])
+    return {
+        "ETag": f'"{kind}-{version}"',
+        "Last-Modified": format_datetime(last_modified.astimezone(timezone.utc), usegmt=True),
+    }
+
+'''Функция построения ETag представления ресурса, сжатого в кодировке encoding'''
+def encoded_etag(etag: str, encoding: str) -> str:
+    return f'{etag[:-1]}-{encoding}"'
+
+'''Функция получения ETag ресурса без суффикса кодировки и признака слабого ETag'''
+def base_etag(etag: str) -> str:
+    etag = etag.strip().removeprefix("W/")
+    for suffix in ENCODING_SUFFIXES:
+        if etag.endswith(f'{suffix}"'):
+            return f'{etag[:-len(suffix) - 1]}"'
+    return etag
+
+'''Функция поиска в If-None-Match тега, совпадающего с ETag ресурса в любой кодировке (слабое сравнение); None — совпадения нет'''
+def matching_etag(if_none_match: str, etag: str) -> str | None:
+    for tag in if_none_match.split(","):
+        if base_etag(tag) == etag:
+            return tag.strip()
+    return None
+
+'''Функция проверки, является ли запрос условным'''
+def is_conditional(request: Request) -> bool:
+    return "If-None-Match" in request.headers or "If-Modified-Since" in request.headers
+
+'''Функция проверки условного запроса: True, если у клиента уже актуальная версия'''
+def is_not_modified(request: Request, headers: dict[str, str]) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    # If-None-Match важнее If-Modified-Since
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return matching_etag(if_none_match, headers["ETag"]) is not None
+    if_modified_since = request.headers.get("If-Modified-Since")
+    # у ресурсов без Last-Modified (страницы комментариев) If-Modified-Since не проверяется
+    if if_modified_since is not None and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+'''Функция построения ответа 304 Not Modified: ETag в нём — совпавший тег клиента,
+то есть ETag представления (в той кодировке), которое у клиента уже есть'''
+def not_modified(request: Request, headers: dict[str, str]) -> Response:
+    if_none_match = request.headers.get("If-None-Match")
+    etag = matching_etag(if_none_match, headers["ETag"]) if if_none_match else None
+    headers = {**headers, "Vary": "Accept-Encoding"} | ({"ETag": etag} if etag else {})
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
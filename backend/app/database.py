@@ -1,8 +1,10 @@
-﻿import os
+﻿import logging
+import os
+import uuid
 from typing import Annotated, AsyncGenerator
 
 from dotenv import load_dotenv
-from fastapi import Depends
+from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -12,6 +14,11 @@ from sqlalchemy.orm import declarative_base
 from redis.asyncio import Redis as AsyncRedis
 import os
 
+from app.metrics import InstrumentedRedis, instrument_engine
+from app.pools import TimedAsyncQueuePool, TimedRedisPool
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 # USER = os.getenv["POSTGRES_USER"]
 # PASSWORD = os.getenv["POSTGRES_PASSWORD"]
@@ -28,12 +35,56 @@ PORT = os.environ["POSTGRES_PORT"]
 REDIS_HOST = os.environ["REDIS_HOST"]
 REDIS_PORT = int(os.environ["REDIS_PORT"])
 
+# пул соединений с PostgreSQL (на каждый воркер и каждую базу: основную и реплики)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+# число подготовленных запросов, кэшируемых на одно соединение (0 — без кэша)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+# подключение через PgBouncer в режиме pool_mode=transaction: соседние транзакции попадают на разные
+# серверные соединения, поэтому кэш подготовленных запросов отключается, а их имена делаются уникальными
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+# пул соединений с Redis (на каждый клиент каждого воркера)
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 2**31))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 20))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 0)) or None
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 0)) or None
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 0))
+
 
 DATABASE_URL = (
     f"postgresql+asyncpg://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB}"
 )
 
-engine = create_async_engine(DATABASE_URL)
+'''Функция получения параметров подключения asyncpg (с учётом работы через PgBouncer)'''
+def connect_args() -> dict:
+    if DB_PGBOUNCER:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+
+'''Функция создания движка SQLAlchemy с настроенным пулом соединений и замером запросов'''
+def create_engine(url: str):
+    new_engine = create_async_engine(
+        url,
+        poolclass=TimedAsyncQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args(),
+    )
+    instrument_engine(new_engine)
+    return new_engine
+
+engine = create_engine(DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(bind=engine)
 Base = declarative_base()
 
@@ -43,7 +94,9 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
         try:
             yield session
         except Exception as e:
-            print(e)
+            # HTTPException — штатный ответ обработчика (404, 403 и т. п.), а не ошибка базы данных
+            if not isinstance(e, HTTPException):
+                logger.warning("Database session rolled back: %r", e)
             await session.rollback()
             raise e
         finally:
@@ -52,6 +105,19 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
 
 SessionDep = Annotated[AsyncSession, Depends(get_db_session)]
 
-redis_client = AsyncRedis(
-    host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True
-)
+'''Функция создания клиента Redis с собственным настроенным пулом соединений и замером команд'''
+def create_redis(decode_responses: bool) -> AsyncRedis:
+    pool = TimedRedisPool(
+        host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=decode_responses,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+    )
+    return InstrumentedRedis(connection_pool=pool)
+
+redis_client = create_redis(decode_responses=True)
+
+# клиент без декодирования ответов: кэш хранит готовые тела HTTP-ответов в байтах
+redis_cache_client = create_redis(decode_responses=False)
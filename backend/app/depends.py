@@ -1,19 +1,40 @@
-﻿from fastapi import Depends, HTTPException, status
+﻿from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from app.utils import check_jwt
+from app.jwt_cache import jwt_cache, is_token_revoked
 from sqlalchemy import select
+from sqlalchemy.orm import raiseload
 from app.news.models import News
 from app.comment.models import Comment
 from app.database import SessionDep
 
 oauth2 = OAuth2PasswordBearer(tokenUrl="/sessions/login")
+optional_oauth2 = OAuth2PasswordBearer(tokenUrl="/sessions/login", auto_error=False)
 
-async def get_jwt_payload(jwt_token: str = Depends(oauth2)):
-    jwt_payload = check_jwt(jwt_token)
-    if not jwt_payload:
+# проверка токена; проверенный payload сохраняется в request.state, откуда его берёт
+# ReadYourWritesMiddleware (без повторной проверки токена)
+async def _verify_jwt(request: Request, jwt_token: str) -> dict | None:
+    jwt_payload = jwt_cache.get(jwt_token)
+    if jwt_payload is None:
+        jwt_payload = check_jwt(jwt_token)
+        if not jwt_payload or await is_token_revoked(jwt_payload):
+            return None
+        jwt_cache.put(jwt_token, jwt_payload)
+    request.state.jwt_payload = jwt_payload
+    return jwt_payload
+
+async def get_jwt_payload(request: Request, jwt_token: str = Depends(oauth2)):
+    jwt_payload = await _verify_jwt(request, jwt_token)
+    if jwt_payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect access token")
     return jwt_payload
 
+# пользователь для открытых запросов: без токена или с недействительным токеном — None
+async def get_optional_jwt_payload(request: Request, jwt_token: str | None = Depends(optional_oauth2)):
+    if jwt_token is None:
+        return None
+    return await _verify_jwt(request, jwt_token)
+
 async def is_admin(jwt_payload: str = Depends(get_jwt_payload)):
     if jwt_payload["user_role"] != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied")
@@ -32,7 +53,8 @@ async def author_or_admin(jwt_payload: str = Depends(get_jwt_payload)):
     return int(jwt_payload["user_id"])
     
 async def same_news_author_or_admin(news_id: int, db: SessionDep, jwt_payload: str = Depends(get_jwt_payload)):
-    news = await db.execute(select(News).where(News.news_id == news_id))
+    # для проверки прав нужен только author_id, связи новости не загружаются
+    news = await db.execute(select(News).options(raiseload("*")).where(News.news_id == news_id))
     news = news.scalar_one_or_none()
     if not news:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="News not found")
@@ -41,7 +63,7 @@ async def same_news_author_or_admin(news_id: int, db: SessionDep, jwt_payload: s
     return news
     
 async def same_comment_author_or_admin(comment_id: int, db: SessionDep, jwt_payload: str = Depends(get_jwt_payload)):
-    comment = await db.execute(select(Comment).where(Comment.comment_id == comment_id))
+    comment = await db.execute(select(Comment).options(raiseload("*")).where(Comment.comment_id == comment_id))
     comment = comment.scalar_one_or_none()
     if not comment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
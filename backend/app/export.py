@@ -0,0 +1,30 @@
+import os
+from typing import AsyncIterator
+
+from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+from app.replica import read_sessionmaker
+
+load_dotenv()
+# сколько строк за раз читается из серверного курсора и отправляется клиенту при экспорте
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+'''Функция потоковой выгрузки результата запроса в NDJSON: строки читаются из серверного курсора
+пачками по batch_size, поэтому память не растёт с размером таблицы. Экспорт использует собственную сессию,
+так как ответ отправляется уже после завершения обработчика запроса (на реплике, если они настроены)'''
+async def stream_ndjson(statement: Select, schema: type[BaseModel], batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    async with read_sessionmaker()() as session:
+        result = await session.stream_scalars(statement.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield b"".join(schema.model_validate(row).model_dump_json().encode() + b"\n" for row in partition)
+
+'''Функция построения потокового NDJSON-ответа'''
+def ndjson_response(statement: Select, schema: type[BaseModel], filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_ndjson(statement, schema),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
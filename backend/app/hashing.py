@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from argon2 import PasswordHasher
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+from app.metrics import (
+    PASSWORD_HASH_LATENCY, PASSWORD_HASH_QUEUE_WAIT, PASSWORD_HASH_REJECTED, PASSWORD_HASH_RUNNING, PASSWORD_HASH_WAITING,
+)
+
+load_dotenv()
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536)) # в КиБ
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+# пул для хэширования: "thread" (argon2 отпускает GIL) или "process"
+HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+# максимальное число одновременных хэширований
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+# сколько секунд запрос может ждать свободного исполнителя, прежде чем получить 503
+HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 2))
+
+ph = PasswordHasher(time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST, parallelism=ARGON2_PARALLELISM)
+
+'''Функция для хэширования пароля (выполняется в пуле)'''
+def _hash_password(password: str) -> str:
+    return ph.hash(password)
+
+'''Функция для проверки пароля (выполняется в пуле)'''
+def _check_password(password: str, hashed_password: str) -> bool:
+    try:
+        ph.verify(hashed_password, password)
+        return True
+    except Exception:
+        return False
+
+
+# ограниченный пул для Argon2: хэширование не блокирует event loop,
+# а при переполнении очереди запрос получает 503 вместо бесконечного ожидания
+class PasswordHashPool:
+    def __init__(self, workers: int, executor: str, queue_timeout: float):
+        self.workers = workers
+        self.executor_kind = executor
+        self.queue_timeout = queue_timeout
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(workers)
+        # метрики очереди (они же экспортируются в /metrics и показываются в /admin/pools)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="argon2")
+        return self._executor
+
+    async def run(self, operation: str, func, *args):
+        self.waiting += 1
+        PASSWORD_HASH_WAITING.inc()
+        queued = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except TimeoutError:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.labels(operation).inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing is overloaded, try again later",
+                headers={"Retry-After": str(max(1, round(self.queue_timeout)))},
+            )
+        finally:
+            self.waiting -= 1
+            PASSWORD_HASH_WAITING.dec()
+        started = time.perf_counter()
+        PASSWORD_HASH_QUEUE_WAIT.labels(operation).observe(started - queued)
+        self.running += 1
+        PASSWORD_HASH_RUNNING.inc()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            PASSWORD_HASH_LATENCY.labels(operation).observe(time.perf_counter() - started)
+            self.running -= 1
+            PASSWORD_HASH_RUNNING.dec()
+            self.completed += 1
+            self._semaphore.release()
+
+    # состояние очереди: ожидающие и выполняющиеся задачи, счётчики выполненных и отклонённых
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "executor": self.executor_kind,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_hash_pool = PasswordHashPool(HASH_WORKERS, HASH_EXECUTOR, HASH_QUEUE_TIMEOUT)
+
+'''Функция для хэширования пароля'''
+async def hash_password(password: str) -> str:
+    return await password_hash_pool.run("hash", _hash_password, password)
+
+'''Функция для проверки пароля'''
+async def check_password(password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run("verify", _check_password, password, hashed_password)
+
+
+'''Функция замера медианного времени хэширования (в мс) для заданных параметров Argon2'''
+def measure(time_cost: int, memory_cost: int, parallelism: int, rounds: int = 5) -> float:
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.hash("calibration-password")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+'''Функция подбора параметров Argon2 под целевое время хэширования на текущей машине'''
+def calibrate(target_ms: float, memory_cost: int, parallelism: int, min_memory_cost: int = 8192) -> tuple[int, int, float]:
+    # при минимальном time_cost уменьшаем память, пока не уложимся в цель
+    while memory_cost > min_memory_cost and measure(1, memory_cost, parallelism) > target_ms:
+        memory_cost //= 2
+    # затем увеличиваем time_cost, пока не превысим цель, и берём последнее подходящее значение
+    time_cost = 1
+    elapsed = measure(time_cost, memory_cost, parallelism)
+    while True:
+        next_elapsed = measure(time_cost + 1, memory_cost, parallelism)
+        if next_elapsed > target_ms:
+            break
+        time_cost += 1
+        elapsed = next_elapsed
+    return time_cost, memory_cost, elapsed
+
+
+# подбор параметров: python -m app.hashing --target-ms 50
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Подбор параметров Argon2 под целевое время хэширования")
+    parser.add_argument("--target-ms", type=float, default=50)
+    parser.add_argument("--memory-cost", type=int, default=ARGON2_MEMORY_COST)
+    parser.add_argument("--parallelism", type=int, default=ARGON2_PARALLELISM)
+    args = parser.parse_args()
+
+    time_cost, memory_cost, elapsed = calibrate(args.target_ms, args.memory_cost, args.parallelism)
+    print(f"# median hash time: {elapsed:.1f} ms (target {args.target_ms:.0f} ms)")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={memory_cost}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from app.database import redis_client
+from app.utils import LIFETIME
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+# максимальное число проверенных JWT-токенов в кэше одного воркера
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10000))
+# канал Redis, через который воркеры сообщают друг другу об отзыве токенов пользователя
+INVALIDATION_CHANNEL = "jwt_cache:invalidate"
+# ожидание сообщения ограничено явно, иначе при заданном REDIS_SOCKET_TIMEOUT простаивающая подписка обрывалась бы
+LISTEN_POLL_SECONDS = 1.0
+# отметка отзыва хранится, пока могут быть действительны выпущенные до неё токены
+REVOCATION_TTL_SECONDS = LIFETIME * 60 + 60
+
+# отметка отзыва токенов пользователя: токены, выпущенные (iat) раньше неё, недействительны
+def revoked_key(user_id: int | str) -> str:
+    return f"jwt:revoked:{user_id}"
+
+
+# ограниченный LRU-кэш проверенных JWT: ключ — sha256 токена, запись живёт до exp токена.
+# Кэш работает, только пока воркер подписан на канал отзыва (active), иначе отзыв мог бы потеряться.
+# Отметки отзыва, полученные воркером, хранятся и локально: токен, выпущенный до отметки, не попадёт в кэш,
+# даже если его проверка в Redis выполнялась одновременно с отзывом
+class JWTCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.active = False
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self._by_user: dict[str, set[bytes]] = {}
+        self._revoked: dict[str, float] = {}
+
+    @staticmethod
+    def _digest(jwt_token: str) -> bytes:
+        return hashlib.sha256(jwt_token.encode()).digest()
+
+    def _remove(self, key: bytes) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_keys = self._by_user.get(entry[0]["user_id"])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._by_user[entry[0]["user_id"]]
+
+    # получение payload проверенного токена; None, если токена нет в кэше или он истёк
+    def get(self, jwt_token: str) -> dict | None:
+        if not self.active:
+            return None
+        key = self._digest(jwt_token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        payload, exp = entry
+        if exp <= time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    # сохранение payload только что проверенного токена
+    def put(self, jwt_token: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        if not self.active or exp is None or self.is_revoked(payload):
+            return
+        key = self._digest(jwt_token)
+        self._entries[key] = (payload, float(exp))
+        self._entries.move_to_end(key)
+        self._by_user.setdefault(payload["user_id"], set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    # удаление всех закэшированных токенов пользователя в этом воркере
+    def invalidate_user(self, user_id: int | str) -> None:
+        for key in list(self._by_user.get(str(user_id), ())):
+            self._remove(key)
+
+    # отзыв токенов пользователя, выпущенных раньше revoked_before, в этом воркере
+    def revoke_user(self, user_id: int | str, revoked_before: float) -> None:
+        user_id = str(user_id)
+        expired = time.time() - REVOCATION_TTL_SECONDS
+        self._revoked = {key: value for key, value in self._revoked.items() if value > expired}
+        self._revoked[user_id] = max(revoked_before, self._revoked.get(user_id, 0.0))
+        self.invalidate_user(user_id)
+
+    # отозван ли токен по отметкам, известным этому воркеру (токены без iat выпущены до появления отзыва)
+    def is_revoked(self, payload: dict) -> bool:
+        revoked_before = self._revoked.get(str(payload["user_id"]))
+        return revoked_before is not None and float(payload.get("iat", 0)) < revoked_before
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+
+
+jwt_cache = JWTCache(JWT_CACHE_SIZE)
+
+'''Функция отзыва всех выпущенных на данный момент JWT-токенов пользователя во всех воркерах
+(после изменения или удаления пользователя, в том числе смены роли)'''
+async def revoke_user_tokens(user_id: int | str) -> None:
+    revoked_before = time.time()
+    await redis_client.set(revoked_key(user_id), revoked_before, ex=REVOCATION_TTL_SECONDS)
+    jwt_cache.revoke_user(user_id, revoked_before)
+    await redis_client.publish(INVALIDATION_CHANNEL, f"{user_id}:{revoked_before}")
+
+'''Функция проверки, не отозван ли токен (вызывается для токенов, которых ещё нет в кэше).
+При недоступности Redis учитываются только отметки, известные воркеру'''
+async def is_token_revoked(payload: dict) -> bool:
+    if jwt_cache.is_revoked(payload):
+        return True
+    try:
+        revoked_before = await redis_client.get(revoked_key(payload["user_id"]))
+    except RedisError as e:
+        logger.warning("JWT revocation check failed for user %s: %s", payload["user_id"], e)
+        return False
+    return revoked_before is not None and float(payload.get("iat", 0)) < float(revoked_before)
+
+'''Фоновая задача воркера: применяет отзывы токенов, опубликованные другими воркерами'''
+async def listen_invalidations() -> None:
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                jwt_cache.active = True
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_POLL_SECONDS)
+                    if message is not None and message["type"] == "message":
+                        user_id, _, revoked_before = message["data"].partition(":")
+                        jwt_cache.revoke_user(user_id, float(revoked_before or time.time()))
+        except (RedisError, OSError) as e:
+            logger.warning("JWT cache invalidation listener disconnected: %s", e)
+        finally:
+            # без подписки сообщения об отзыве могут быть потеряны, поэтому кэш выключается и сбрасывается
+            jwt_cache.active = False
+            jwt_cache.clear()
+        await asyncio.sleep(1)
@@ -1,14 +1,39 @@
-﻿from fastapi import FastAPI
+﻿from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
 
 from .comment.urls import router as comment_router
 from .news.urls import router as news_router
 from .user.urls import router as user_router
 from .session.urls import router as session_router
+from .media.urls import router as media_router
+from .admin.urls import router as admin_router
+from .media.storage import MEDIA_DIR, ImmutableStaticFiles, media_executor
+from .jwt_cache import listen_invalidations
+from .news.view_counter import VIEW_FLUSH_INTERVAL, view_counter
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware, metrics_response, mark_worker_dead
+from .profiler import SQL_PROFILER, SQLProfilerMiddleware
+from .replica import ReplicaSessionLocals, ReadYourWritesMiddleware
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # подписка на отзыв закэшированных JWT-токенов, опубликованный другими воркерами
+    jwt_listener = asyncio.create_task(listen_invalidations())
+    # периодический перенос накопленных в Redis просмотров новостей в базу данных
+    view_flusher = asyncio.create_task(view_counter.run(VIEW_FLUSH_INTERVAL))
+    yield
+    jwt_listener.cancel()
+    # при остановке задача переносит оставшиеся просмотры, её завершение нужно дождаться
+    view_flusher.cancel()
+    await asyncio.gather(view_flusher, return_exceptions=True)
+    media_executor.shutdown(wait=False, cancel_futures=True)
+    mark_worker_dead()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,12 +44,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["x-jwt"],
+    expose_headers=["x-jwt", "ETag", "Last-Modified", "Retry-After"],
 )
 
+# после записи клиент какое-то время читает из основной базы, а не из отстающей реплики
+if ReplicaSessionLocals:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# сжатие ответов gzip/brotli по Accept-Encoding (ответы из кэша приходят уже сжатыми)
+app.add_middleware(CompressionMiddleware)
+
+# отчёт о SQL-запросах каждого запроса в заголовках X-SQL-* (только для отладки)
+if SQL_PROFILER:
+    app.add_middleware(SQLProfilerMiddleware)
+
+# метрики Prometheus: подключается последним, чтобы задержка включала все остальные middleware
+app.add_middleware(MetricsMiddleware)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
+os.makedirs(MEDIA_DIR, exist_ok=True)
+# загруженные изображения и их варианты (имена из хэша содержимого, кэшируются клиентом навсегда)
+app.mount("/static/media", ImmutableStaticFiles(directory=MEDIA_DIR), name="media")
 # папка с обложками для новостей
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
@@ -32,3 +74,10 @@ app.include_router(user_router, prefix="/user")
 app.include_router(news_router, prefix="/news")
 app.include_router(comment_router, prefix="/comment")
 app.include_router(session_router, prefix="/session")
+app.include_router(media_router, prefix="/media")
+app.include_router(admin_router, prefix="/admin")
+
+# метрики в текстовом формате Prometheus (доступ к ним стоит ограничить на уровне прокси)
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return metrics_response()
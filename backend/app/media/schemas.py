@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+class MediaRead(BaseModel):
+    # значение для полей cover / avatar
+    path: str
+    url: str
+    # URL вариантов: название варианта -> формат -> URL (варианты появляются после фоновой обработки)
+    variants: dict[str, dict[str, str]]
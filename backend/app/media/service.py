@@ -0,0 +1,38 @@
+import asyncio
+import hashlib
+import logging
+
+from fastapi import BackgroundTasks, HTTPException, UploadFile, status
+
+from .schemas import MediaRead
+from .storage import (
+    MEDIA_MAX_UPLOAD_MB, STATIC_URL, media_executor, detect_format, original_path, save_original,
+    generate_variants, media_variants,
+)
+
+logger = logging.getLogger(__name__)
+
+'''Фоновая задача: генерация вариантов изображения в пуле, не занимая event loop'''
+async def process_media(path: str) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(media_executor, generate_variants, path)
+    except Exception:
+        logger.exception("Failed to generate variants for %s", path)
+
+
+class MediaService:
+    # загрузка изображения: оригинал сохраняется под именем из хэша содержимого,
+    # варианты генерируются в фоне после отправки ответа
+    async def upload(self, file: UploadFile, background_tasks: BackgroundTasks) -> MediaRead:
+        max_bytes = int(MEDIA_MAX_UPLOAD_MB * 1024 * 1024)
+        data = await file.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image is too large")
+        image_format = await asyncio.to_thread(detect_format, data)
+        if image_format is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported image")
+        path = original_path(hashlib.sha256(data).hexdigest(), image_format)
+        await asyncio.to_thread(save_original, path, data)
+        background_tasks.add_task(process_media, path)
+        return MediaRead(path=path, url=f"{STATIC_URL}/{path}", variants=media_variants(path))
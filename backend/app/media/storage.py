@@ -0,0 +1,129 @@
+import io
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable
+
+from dotenv import load_dotenv
+from PIL import Image, ImageOps
+from fastapi.staticfiles import StaticFiles
+from starlette.types import Scope
+
+load_dotenv()
+# число потоков, в которых генерируются варианты изображений
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", 2))
+# максимальный размер загружаемого изображения в мегабайтах
+MEDIA_MAX_UPLOAD_MB = float(os.getenv("MEDIA_MAX_UPLOAD_MB", 10))
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+# загруженные изображения: static/media/<sha256>/original.<ext> и варианты рядом с ним
+MEDIA_DIR = os.path.join(STATIC_DIR, "media")
+STATIC_URL = "/static"
+
+# варианты изображения: название -> максимальный размер большей стороны в пикселях
+MEDIA_VARIANTS = {"thumbnail": 160, "card": 640, "full": 1600}
+# форматы вариантов: название -> (формат Pillow, расширение, параметры сохранения)
+MEDIA_FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+# допустимые форматы загружаемых изображений и расширения, под которыми хранится оригинал
+UPLOAD_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+MEDIA_PATH_RE = re.compile(r"^media/([0-9a-f]{64})/original\.[a-z]+$")
+
+media_executor = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix="media")
+
+
+# раздача загруженных изображений: имена содержат хэш содержимого, поэтому файлы можно кэшировать навсегда
+class ImmutableStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+'''Функция получения пути (относительно static) оригинала по хэшу содержимого и формату'''
+def original_path(digest: str, image_format: str) -> str:
+    return f"media/{digest}/original.{UPLOAD_FORMATS[image_format]}"
+
+'''Функция получения имени файла варианта'''
+def variant_filename(variant: str, media_format: str) -> str:
+    return f"{variant}.{MEDIA_FORMATS[media_format][1]}"
+
+'''Функция построения URL вариантов изображения по значению поля cover/avatar;
+None, если изображение загружено не через /media/ (например, имя файла из начальных данных)'''
+def media_variants(path: str | None) -> dict[str, dict[str, str]] | None:
+    match = MEDIA_PATH_RE.match(path or "")
+    if match is None:
+        return None
+    digest = match.group(1)
+    return {
+        variant: {
+            media_format: f"{STATIC_URL}/media/{digest}/{variant_filename(variant, media_format)}"
+            for media_format in MEDIA_FORMATS
+        }
+        for variant in MEDIA_VARIANTS
+    }
+
+'''Функция проверки загруженного файла: возвращает формат изображения или None, если это не изображение
+допустимого формата'''
+def detect_format(data: bytes) -> str | None:
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = image.format
+            image.verify()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+    return image_format if image_format in UPLOAD_FORMATS else None
+
+'''Функция атомарной записи файла: запись во временный файл с уникальным именем в том же каталоге
+и переименование (одинаковые загрузки в соседних потоках и процессах не пишут в один временный файл)'''
+def write_atomic(full_path: str, write: Callable[[BinaryIO], None]) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        # mkstemp создаёт файл с правами 0600, а файлы раздаются как статика
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+'''Функция сохранения оригинала (повторная загрузка того же содержимого ничего не перезаписывает)'''
+def save_original(path: str, data: bytes) -> None:
+    full_path = os.path.join(STATIC_DIR, path)
+    if os.path.exists(full_path):
+        return
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    write_atomic(full_path, lambda file: file.write(data))
+
+'''Функция перевода изображения в RGB для JPEG (прозрачность заменяется белым фоном)'''
+def _to_rgb(image: Image.Image) -> Image.Image:
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+'''Функция генерации всех вариантов изображения (выполняется в пуле media_executor).
+Файлы пишутся во временные и атомарно переименовываются, уже готовые варианты пропускаются'''
+def generate_variants(path: str) -> None:
+    directory = os.path.dirname(os.path.join(STATIC_DIR, path))
+    with Image.open(os.path.join(STATIC_DIR, path)) as original:
+        original.seek(0)
+        image = ImageOps.exif_transpose(original)
+        for variant, size in MEDIA_VARIANTS.items():
+            resized = None
+            for media_format, (pil_format, _, options) in MEDIA_FORMATS.items():
+                target = os.path.join(directory, variant_filename(variant, media_format))
+                if os.path.exists(target):
+                    continue
+                if resized is None:
+                    resized = image.copy()
+                    resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+                output = _to_rgb(resized) if pil_format == "JPEG" else resized
+                write_atomic(target, lambda file: output.save(file, pil_format, **options))
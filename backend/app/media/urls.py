@@ -0,0 +1,14 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile
+from .schemas import MediaRead
+from .service import MediaService
+from app.depends import get_jwt_payload
+from app.rate_limit import WRITE_USER_LIMIT, limit_by_user
+
+router = APIRouter(tags=["media"])
+
+async def media_service(service: MediaService = Depends()) -> MediaService:
+    return service
+
+@router.post("/", response_model=MediaRead, dependencies=[Depends(limit_by_user("write_user", WRITE_USER_LIMIT))])
+async def upload_media(file: UploadFile, background_tasks: BackgroundTasks, service: MediaService = Depends(media_service), _ = Depends(get_jwt_payload)):
+    return await service.upload(file, background_tasks)
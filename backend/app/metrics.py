@@ -0,0 +1,174 @@
+import os
+import time
+from contextvars import ContextVar
+
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from redis.asyncio import Redis as AsyncRedis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.profiler import record_query
+
+# при нескольких воркерах метрики каждого процесса пишутся в файлы этого каталога и суммируются при отдаче /metrics
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being processed", ["method", "route"], multiprocess_mode="livesum",
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL query latency", ["route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL queries executed per HTTP request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Total SQL time per HTTP request", ["route"],
+)
+REDIS_COMMAND_LATENCY = Histogram(
+    "redis_command_duration_seconds", "Redis command latency", ["command"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+REDIS_COMMAND_ERRORS = Counter(
+    "redis_command_errors_total", "Redis commands that raised an error", ["command"],
+)
+CACHE_FILL_COALESCED = Counter(
+    "cache_fill_coalesced_total", "Cache misses served by another in-flight fill instead of the database", ["source"],
+)
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds", "Argon2 hash/verify time in the executor", ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+PASSWORD_HASH_WAITING = Gauge(
+    "password_hash_waiting", "Argon2 operations waiting for a free worker", multiprocess_mode="livesum",
+)
+PASSWORD_HASH_RUNNING = Gauge(
+    "password_hash_running", "Argon2 operations being executed", multiprocess_mode="livesum",
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Argon2 operations rejected with 503 after the queue timeout", ["operation"],
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds", "Time waiting for a free Argon2 worker", ["operation"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0),
+)
+
+
+# счётчики SQL-запросов текущего HTTP-запроса
+class RequestStats:
+    __slots__ = ("route", "queries", "query_time")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+        self.query_time = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+'''Функция получения счётчиков текущего HTTP-запроса (None вне запроса, например в фоновой задаче)'''
+def current_request_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+'''Функция получения шаблона пути маршрута (/news/{news_id}), чтобы число меток не росло с числом адресов'''
+def route_template(scope: Scope) -> str:
+    partial = None
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+'''Функция подключения замера SQL-запросов к движку (основной базы или реплики)'''
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _request_stats.get()
+        DB_QUERY_LATENCY.labels(stats.route if stats else "background").observe(elapsed)
+        if stats is not None:
+            stats.queries += 1
+            stats.query_time += elapsed
+        record_query(statement, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+'''Функция построения ответа /metrics в текстовом формате Prometheus'''
+def metrics_response() -> Response:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+'''Функция удаления метрик-gauge завершившегося воркера (только при нескольких воркерах)'''
+def mark_worker_dead() -> None:
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+# клиент Redis, измеряющий время и ошибки каждой команды (команды внутри pipeline не учитываются по отдельности)
+class InstrumentedRedis(AsyncRedis):
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except Exception:
+            REDIS_COMMAND_ERRORS.labels(command).inc()
+            raise
+        finally:
+            REDIS_COMMAND_LATENCY.labels(command).observe(time.perf_counter() - started)
+
+
+# ASGI-middleware метрик HTTP: задержка по маршрутам, запросы в обработке и SQL-запросы на один HTTP-запрос
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, route = scope["method"], route_template(scope)
+        stats = RequestStats(route)
+        token = _request_stats.set(stats)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(time.perf_counter() - started)
+            in_progress.dec()
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.query_time)
+            _request_stats.reset(token)
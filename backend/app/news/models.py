@@ -1,5 +1,6 @@
-﻿from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+﻿from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime, timezone
 from ..database import Base
 
@@ -9,9 +10,27 @@ class News(Base):
     news_id = Column(Integer, primary_key=True, index=True)
     header = Column(String, index=True, nullable=False)
     content = Column(JSON, nullable=False)
-    publication_date = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    publication_date = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
     author_id = Column(Integer, ForeignKey("user.user_id"), nullable=False)
     cover = Column(String, nullable=True)
+    # денормализованное число комментариев; меняется атомарно вместе с комментариями
+    comment_count = Column(Integer, nullable=False, default=0)
+    # число просмотров; накапливается в Redis и переносится пачками (см. view_counter), поэтому отстаёт от реального
+    view_count = Column(Integer, nullable=False, default=0)
+    # поисковый вектор заголовка и текста блоков; заполняется триггером news_search_vector_update
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
-    author = relationship("User", back_populates="news", lazy="subquery")
-    comment = relationship("Comment", back_populates="news", cascade="all, delete-orphan", lazy="subquery")
\ No newline at end of file
+    author = relationship("User", back_populates="news", lazy="raise")
+    comment = relationship("Comment", back_populates="news", cascade="all, delete-orphan", lazy="raise")
+
+    __table_args__ = (
+        # индекс для keyset-пагинации ленты новостей
+        Index("ix_news_publication_date_news_id", "publication_date", "news_id"),
+        # индекс для ленты, отсортированной по числу комментариев
+        Index("ix_news_comment_count_news_id", "comment_count", "news_id"),
+        # индекс для ленты автора и проверки ссылок при удалении пользователя
+        Index("ix_news_author_id_publication_date_news_id", "author_id", "publication_date", "news_id"),
+        # индекс для полнотекстового поиска
+        Index("ix_news_search_vector", "search_vector", postgresql_using="gin"),
+    )
\ No newline at end of file
@@ -0,0 +1,16 @@
+import asyncio
+from typing import Sequence
+
+from app.database import AsyncSessionLocal
+from .service import NewsService
+
+'''Функция пересчёта числа комментариев у всех новостей'''
+async def recount_comments() -> Sequence[int]:
+    async with AsyncSessionLocal() as session:
+        return await NewsService(session).recount_comments()
+
+
+# восстановление счётчиков комментариев: python -m app.news.recount
+if __name__ == "__main__":
+    news_ids = asyncio.run(recount_comments())
+    print(f"comment_count fixed for {len(news_ids)} news: {news_ids}")
@@ -1,7 +1,8 @@
-﻿from pydantic import BaseModel, ConfigDict
+﻿from pydantic import BaseModel, ConfigDict, computed_field
 from datetime import datetime
 from typing import Optional, Any
 from app.user.schemas import UserRead
+from app.media.storage import media_variants
 
 class NewsBase(BaseModel):
     header: str
@@ -19,4 +20,33 @@ class NewsRead(NewsBase):
     publication_date: datetime
     author_id: int
     author: UserRead
+    comment_count: int = 0
+    model_config = ConfigDict(from_attributes=True)
+
+    # URL готовых вариантов обложки (если она загружена через /media/)
+    @computed_field
+    @property
+    def cover_variants(self) -> Optional[dict[str, dict[str, str]]]:
+        return media_variants(self.cover)
+
+# новость в ленте вместе с числом просмотров; в ответ GET /news/{news_id} оно не входит,
+# чтобы просмотры не меняли ETag новости (для него есть GET /news/{news_id}/views)
+class NewsListItem(NewsRead):
+    view_count: int = 0
+
+class NewsPage(BaseModel):
+    items: list[NewsListItem]
+    next_cursor: Optional[str] = None
+
+class NewsViews(BaseModel):
+    news_id: int
+    view_count: int
+
+class NewsExport(NewsBase):
+    news_id: int
+    publication_date: datetime
+    author_id: int
+    comment_count: int
+    view_count: int
+    updated_at: datetime
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,10 +1,44 @@
-﻿from typing import Sequence
-from fastapi import HTTPException, status
-from sqlalchemy import select
+﻿from typing import Literal, Sequence
+from datetime import datetime
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select, insert, update, delete, func, tuple_, bindparam
+from sqlalchemy.orm import joinedload, raiseload
 
+from app.bulk import BulkResult, load_ndjson
+from app.cache import CachedResponse, response_cache, news_cache_key, comments_cache_tag
+from app.compression import cached_json_response, request_encoding
+from app.conditional import validator_headers, is_conditional, is_not_modified, not_modified
 from app.database import SessionDep
+from app.export import ndjson_response
+from app.replica import primary_session
+from app.serialization import nested_columns, nest_row, dump_json
+from app.utils import encode_cursor, decode_date_id_cursor, decode_int_id_cursor, decode_rank_id_cursor
+from app.comment.models import Comment
+from app.user.models import User
+from app.user.service import user_read_columns
 from .models import News
-from .schemas import NewsCreate, NewsUpdate, NewsRead
+from .schemas import NewsCreate, NewsUpdate, NewsRead, NewsPage, NewsViews, NewsExport
+
+# порядок ленты: по дате публикации или по числу комментариев (от большего к меньшему)
+NewsSort = Literal["newest", "most_commented"]
+# конфигурация полнотекстового поиска; должна совпадать с используемой в триггере news_search_vector_update
+SEARCH_CONFIG = "russian"
+
+news_page_adapter = TypeAdapter(NewsPage)
+
+'''Функция получения столбцов NewsListItem вместе с автором для чтения списков без ORM-объектов'''
+def news_read_columns() -> tuple:
+    return (
+        News.news_id, News.header, News.content, News.cover, News.publication_date, News.author_id, News.comment_count,
+        News.view_count, *nested_columns("author", *user_read_columns()),
+    )
+
+'''Функция сериализации страницы новостей из строк Core-запроса'''
+def news_page_response(rows, next_cursor: str | None) -> Response:
+    body = dump_json(news_page_adapter, {"items": [nest_row(row) for row in rows], "next_cursor": next_cursor})
+    return Response(content=body, media_type="application/json")
 
 class NewsService:
     def __init__(self, db: SessionDep):
@@ -14,36 +48,187 @@ class NewsService:
     async def create(self, payload: NewsCreate, user_id: int) -> News:
         new_news = News(**payload.model_dump(), author_id = user_id)
         self.db.add(new_news)
+        await self.db.flush()
+        news_id = new_news.news_id
         await self.db.commit()
-        await self.db.refresh(new_news)
-        return new_news
+        return await self.get(news_id)
     
-    # чтение списка новостей
-    async def list(self) -> Sequence[News]:
-        news = await self.db.execute(select(News))
-        news_list = news.scalars().all()
-        if not news_list:
+    # пакетная загрузка новостей из NDJSON (каждая строка — NewsCreate, автор — загружающий пользователь)
+    async def bulk_create(self, request: Request, user_id: int) -> BulkResult:
+        async def insert_rows(rows: list[dict]) -> None:
+            await self.db.execute(insert(News), rows)
+
+        return await load_ndjson(
+            self.db, request, NewsCreate,
+            lambda payload: {**payload.model_dump(), "author_id": user_id},
+            insert_rows,
+        )
+
+    # чтение страницы ленты новостей, всех или одного автора (keyset-пагинация от новых к старым
+    # по (publication_date, news_id) или от самых обсуждаемых по (comment_count, news_id))
+    async def list(self, limit: int, cursor: str | None = None, sort: NewsSort = "newest", author_id: int | None = None) -> Response:
+        if sort == "most_commented":
+            key, decode = (News.comment_count, News.news_id), decode_int_id_cursor
+        else:
+            key, decode = (News.publication_date, News.news_id), decode_date_id_cursor
+        query = (
+            select(*news_read_columns())
+            .join(User, News.author_id == User.user_id)
+            .order_by(*(column.desc() for column in key))
+            .limit(limit + 1)
+        )
+        if author_id is not None:
+            query = query.where(News.author_id == author_id)
+        if cursor is not None:
+            position = decode(cursor)
+            if position is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            query = query.where(tuple_(*key) < tuple_(*position))
+        news = await self.db.execute(query)
+        news_list = news.mappings().all()
+        if not news_list and cursor is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No news found")
-        return news_list
-    
+        next_cursor = None
+        if len(news_list) > limit:
+            news_list = news_list[:limit]
+            last = news_list[-1]
+            next_cursor = encode_cursor(*(last[column.key] for column in key))
+        return news_page_response(news_list, next_cursor)
+
+    # полнотекстовый поиск по заголовку и тексту новости (keyset-пагинация по (релевантность, news_id));
+    # совпадения в заголовке весят больше совпадений в тексте
+    async def search(self, q: str, limit: int, cursor: str | None = None) -> Response:
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = func.ts_rank_cd(News.search_vector, query)
+        statement = (
+            select(*news_read_columns(), rank.label("rank"))
+            .join(User, News.author_id == User.user_id)
+            .where(News.search_vector.op("@@")(query))
+            .order_by(rank.desc(), News.news_id.desc())
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            position = decode_rank_id_cursor(cursor)
+            if position is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            statement = statement.where(tuple_(rank, News.news_id) < tuple_(*position))
+        rows = (await self.db.execute(statement)).mappings().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last["rank"], last["news_id"])
+        return news_page_response(rows, next_cursor)
+
+    # потоковая выгрузка новостей в NDJSON (при указании since — только изменённых с этого момента)
+    @staticmethod
+    def export(since: datetime | None = None) -> StreamingResponse:
+        query = select(News).options(raiseload("*")).order_by(News.news_id)
+        if since is not None:
+            query = query.where(News.updated_at >= since)
+        return ndjson_response(query, NewsExport, "news.ndjson")
+
     # чтение новости по индексу
     async def get(self, news_id: int) -> News:
-        news = await self.db.execute(select(News).where(News.news_id == news_id))
+        news = await self.db.execute(
+            select(News)
+            .options(joinedload(News.author), raiseload("*"))
+            .where(News.news_id == news_id)
+            .execution_options(populate_existing=True)
+        )
         news = news.scalar_one_or_none()
         if not news:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="News not found")
         return news
     
+    # заголовки-валидаторы новости без загрузки самой новости (версия — последнее изменение новости или её автора)
+    async def get_validators(self, news_id: int) -> dict[str, str]:
+        result = await self.db.execute(
+            select(News.updated_at, User.updated_at)
+            .join(User, News.author_id == User.user_id)
+            .where(News.news_id == news_id)
+        )
+        versions = result.one_or_none()
+        if not versions:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="News not found")
+        return validator_headers("news", news_id, max(versions))
+
+    # загрузка и сериализация новости для кэша (всегда из основной базы, см. primary_session)
+    async def _load_response(self, news_id: int) -> CachedResponse:
+        async with primary_session(self.db) as db:
+            news = await NewsService(db).get(news_id)
+        headers = validator_headers("news", news_id, max(news.updated_at, news.author.updated_at))
+        return CachedResponse(NewsRead.model_validate(news).model_dump_json().encode(), headers)
+
+    # чтение новости по индексу в виде готового JSON-ответа
+    # (read-through кэш в Redis вместе со сжатыми телами, условные запросы;
+    # одновременные промахи по одной новости ждут одну загрузку из базы данных)
+    async def get_response(self, news_id: int, request: Request) -> Response:
+        key = news_cache_key(news_id)
+        cached = await response_cache.get(key, request_encoding(request))
+        if cached is None:
+            # при промахе кэша условный запрос проверяется по версии, без загрузки и сериализации новости
+            if is_conditional(request):
+                headers = await self.get_validators(news_id)
+                if is_not_modified(request, headers):
+                    return not_modified(request, headers)
+            cached = await response_cache.fill(key, lambda: self._load_response(news_id))
+        elif is_not_modified(request, cached.headers):
+            return not_modified(request, cached.headers)
+        return await cached_json_response(request, cached, key)
+
+    # число просмотров новости, уже перенесённых в базу
+    async def get_views(self, news_id: int) -> NewsViews:
+        view_count = await self.db.scalar(select(News.view_count).where(News.news_id == news_id))
+        if view_count is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="News not found")
+        return NewsViews(news_id=news_id, view_count=view_count)
+
     # обновление новости
     async def update(self, news: News, payload: NewsUpdate) -> News:
         for field, value in payload.model_dump(exclude_unset=True).items():
             setattr(news, field, value)
+        news_id = news.news_id
         await self.db.commit()
-        await self.db.refresh(news)
-        return news
+        await response_cache.invalidate(news_cache_key(news_id))
+        return await self.get(news_id)
 
-    # удаление новости
+    # удаление новости вместе с её комментариями (без загрузки комментариев в сессию)
     async def delete(self, news: News) -> str:
-        await self.db.delete(news)
+        news_id = news.news_id
+        await self.db.execute(delete(Comment).where(Comment.news_id == news_id))
+        await self.db.execute(delete(News).where(News.news_id == news_id))
+        await self.db.commit()
+        await response_cache.invalidate(news_cache_key(news_id))
+        await response_cache.invalidate_tag(comments_cache_tag(news_id))
+        return "The news was successfully deleted"
+
+    # прибавление накопленных просмотров пачкой: один UPDATE на набор новостей (executemany).
+    # updated_at не меняется — просмотры не меняют версию новости (ETag, выгрузка изменений)
+    async def add_views(self, views: dict[int, int]) -> None:
+        await self.db.execute(
+            update(News.__table__)
+            .where(News.news_id == bindparam("b_news_id"))
+            .values(view_count=News.view_count + bindparam("b_views"), updated_at=News.updated_at),
+            [{"b_news_id": news_id, "b_views": count} for news_id, count in views.items()],
+        )
+        await self.db.commit()
+
+    # пересчёт денормализованного числа комментариев одним запросом; возвращает индексы исправленных новостей
+    async def recount_comments(self) -> Sequence[int]:
+        actual = (
+            select(func.count(Comment.comment_id))
+            .where(Comment.news_id == News.news_id)
+            .scalar_subquery()
+        )
+        fixed = await self.db.execute(
+            update(News)
+            .where(News.comment_count != actual)
+            .values(comment_count=actual)
+            .returning(News.news_id)
+        )
+        news_ids = fixed.scalars().all()
         await self.db.commit()
-        return "The news was successfully deleted"
\ No newline at end of file
+        if news_ids:
+            await response_cache.invalidate(*(news_cache_key(news_id) for news_id in news_ids))
+        return news_ids
\ No newline at end of file
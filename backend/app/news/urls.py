@@ -1,30 +1,64 @@
-﻿from fastapi import APIRouter, Depends
-from .schemas import NewsCreate, NewsRead, NewsUpdate
-from .service import NewsService
+﻿from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from app.bulk import BulkResult, NDJSON_BODY
+from .schemas import NewsCreate, NewsRead, NewsUpdate, NewsPage, NewsViews
+from .service import NewsService, NewsSort
 from .models import News
-from app.depends import author_or_admin, same_news_author_or_admin
+from .view_counter import view_counter
+from app.replica import ReadSessionDep
+from app.rate_limit import WRITE_USER_LIMIT, limit_by_user
+from app.depends import get_jwt_payload, is_admin, author_or_admin, same_news_author_or_admin
 
-router = APIRouter(tags=["news"])
+router = APIRouter(tags=["news"], default_response_class=ORJSONResponse)
 
 async def news_service(service: NewsService = Depends()) -> NewsService:
     return service
 
-@router.post("/", response_model=NewsRead)
+# сервис для GET-запросов: сессия на реплике для чтения
+async def news_reader(db: ReadSessionDep) -> NewsService:
+    return NewsService(db)
+
+# лимит изменяющих запросов пользователя
+write_limit = Depends(limit_by_user("write_user", WRITE_USER_LIMIT))
+
+@router.post("/", response_model=NewsRead, dependencies=[write_limit])
 async def create_news(payload: NewsCreate, service: NewsService = Depends(news_service), user_id = Depends(author_or_admin)):
     return await service.create(payload, user_id)
 
-@router.get("/", response_model=list[NewsRead])
-async def get_news(service: NewsService = Depends(news_service)):
-    return await service.list()
+@router.post("/bulk", response_model=BulkResult, openapi_extra=NDJSON_BODY, dependencies=[write_limit])
+async def bulk_create_news(request: Request, service: NewsService = Depends(news_service), jwt_payload = Depends(get_jwt_payload), _ = Depends(is_admin)):
+    return await service.bulk_create(request, int(jwt_payload["user_id"]))
+
+@router.get("/", response_model=NewsPage)
+async def get_news(limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None, sort: NewsSort = "newest", author_id: Optional[int] = None, service: NewsService = Depends(news_reader)):
+    return await service.list(limit, cursor, sort, author_id)
+
+@router.get("/search", response_model=NewsPage)
+async def search_news(q: str = Query(min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None, service: NewsService = Depends(news_reader)):
+    return await service.search(q, limit, cursor)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_news(since: Optional[datetime] = None, _ = Depends(is_admin)):
+    return NewsService.export(since)
 
 @router.get("/{news_id}", response_model=NewsRead)
-async def get_news_by_id(news_id: int, service: NewsService = Depends(news_service)):
-    return await service.get(news_id)
+async def get_news_by_id(news_id: int, request: Request, service: NewsService = Depends(news_reader)):
+    response = await service.get_response(news_id, request)
+    # засчитываются только полные ответы: 304 получают повторные проверки уже открытой новости
+    if response.status_code == 200:
+        await view_counter.record(news_id)
+    return response
+
+@router.get("/{news_id}/views", response_model=NewsViews)
+async def get_news_views(news_id: int, service: NewsService = Depends(news_reader)):
+    return await service.get_views(news_id)
 
-@router.put("/{news_id}", response_model=NewsRead)
+@router.put("/{news_id}", response_model=NewsRead, dependencies=[write_limit])
 async def update_news(news_id: int, payload: NewsUpdate, service: NewsService = Depends(news_service), news: News = Depends(same_news_author_or_admin)):
     return await service.update(news, payload)
 
-@router.delete("/{news_id}", response_model=str)
+@router.delete("/{news_id}", response_model=str, dependencies=[write_limit])
 async def delete_news(news_id: int, service: NewsService = Depends(news_service), news: News = Depends(same_news_author_or_admin)):
     return await service.delete(news)
\ No newline at end of file
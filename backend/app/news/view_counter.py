@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+import uuid
+
+from dotenv import load_dotenv
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+from app.database import AsyncSessionLocal, redis_client
+from .service import NewsService
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+# как часто накопленные в Redis просмотры переносятся в news.view_count (в секундах)
+VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", 10))
+# сколько новостей обновляется одним пакетным UPDATE
+VIEW_FLUSH_BATCH_SIZE = int(os.getenv("VIEW_FLUSH_BATCH_SIZE", 500))
+# время жизни блокировки переноса: если воркер упал посреди переноса, его продолжит другой
+VIEW_FLUSH_LOCK_SECONDS = 60
+
+# хэш news_id -> ещё не перенесённые просмотры
+PENDING_KEY = "views:pending"
+# просмотры, которые переносятся сейчас (или не были перенесены из-за сбоя)
+FLUSHING_KEY = "views:flushing"
+FLUSH_LOCK_KEY = "lock:views:flush"
+
+# подготовка переноса: накопленные просмотры атомарно откладываются в отдельный хэш, а новые продолжают
+# копиться в pending. Оставшийся после сбоя хэш переносится первым, чтобы просмотры не терялись
+TAKE_PENDING_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 1
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    return 1
+end
+return 0
+"""
+
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# счётчик просмотров с отложенной записью: GET /news/{news_id} делает только HINCRBY в Redis,
+# а фоновая задача каждого воркера периодически переносит накопленное в базу пакетными UPDATE.
+# Перенос выполняет один воркер за раз (блокировка в Redis). При сбое между UPDATE и удалением
+# перенесённой пачки из Redis она будет учтена повторно; при потере Redis теряются только
+# не перенесённые просмотры (не больше чем за VIEW_FLUSH_INTERVAL секунд)
+class ViewCounter:
+    def __init__(self, redis: AsyncRedis, batch_size: int):
+        self.redis = redis
+        self.batch_size = batch_size
+        self._take_pending = redis.register_script(TAKE_PENDING_LUA)
+        self._release_lock = redis.register_script(RELEASE_LOCK_LUA)
+
+    # учёт просмотра; недоступность Redis не ломает чтение новости, просмотр просто не засчитывается
+    async def record(self, news_id: int) -> None:
+        try:
+            await self.redis.hincrby(PENDING_KEY, str(news_id), 1)
+        except RedisError as e:
+            logger.warning("View count failed for news %s: %s", news_id, e)
+
+    # перенос накопленных просмотров в базу; возвращает число обновлённых новостей
+    # (0, если переносить нечего или перенос уже выполняет другой воркер)
+    async def flush(self) -> int:
+        token = uuid.uuid4().hex
+        if not await self.redis.set(FLUSH_LOCK_KEY, token, nx=True, ex=VIEW_FLUSH_LOCK_SECONDS):
+            return 0
+        try:
+            if not await self._take_pending(keys=[PENDING_KEY, FLUSHING_KEY]):
+                return 0
+            items = [(int(news_id), int(count)) for news_id, count in (await self.redis.hgetall(FLUSHING_KEY)).items()]
+            for start in range(0, len(items), self.batch_size):
+                batch = dict(items[start:start + self.batch_size])
+                async with AsyncSessionLocal() as session:
+                    await NewsService(session).add_views(batch)
+                await self.redis.hdel(FLUSHING_KEY, *(str(news_id) for news_id in batch))
+            return len(items)
+        finally:
+            await self._release_lock(keys=[FLUSH_LOCK_KEY], args=[token])
+
+    # фоновая задача воркера: перенос раз в interval секунд и последний перенос при остановке
+    async def run(self, interval: float) -> None:
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self._flush_logged()
+        finally:
+            await self._flush_logged()
+
+    async def _flush_logged(self) -> None:
+        try:
+            flushed = await self.flush()
+        except Exception as e:
+            logger.warning("View count flush failed: %s", e)
+        else:
+            if flushed:
+                logger.debug("View counts flushed for %d news", flushed)
+
+
+view_counter = ViewCounter(redis_client, VIEW_FLUSH_BATCH_SIZE)
@@ -0,0 +1,83 @@
+import time
+
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+# статистика ожидания соединения из пула: число выдач, суммарное и максимальное время ожидания
+# и число неудачных попыток (истёк таймаут ожидания или не удалось соединиться)
+class PoolWaitStats:
+    def __init__(self):
+        self.acquired = 0
+        self.failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.acquired += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "failures": self.failures,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+# пул соединений SQLAlchemy, измеряющий время ожидания соединения (включая создание нового)
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            self.wait_stats.failures += 1
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+    # состояние пула: занятые, свободные и сверх pool_size (overflow) соединения
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            **self.wait_stats.as_dict(),
+        }
+
+
+# пул соединений Redis: при исчерпании max_connections ждёт освободившееся соединение до timeout секунд
+# и измеряет время ожидания
+class TimedRedisPool(BlockingConnectionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except RedisConnectionError:
+            self.wait_stats.failures += 1
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+    # состояние пула: занятые и свободные соединения
+    def stats(self) -> dict:
+        return {
+            "max_connections": self.max_connections,
+            "checked_out": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            **self.wait_stats.as_dict(),
+        }
@@ -0,0 +1,142 @@
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, NamedTuple
+
+import greenlet
+from dotenv import load_dotenv
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+# профилирование SQL-запросов каждого HTTP-запроса с отчётом в заголовках X-SQL-* (только для отладки)
+SQL_PROFILER = os.getenv("SQL_PROFILER", "false").lower() in ("1", "true", "yes")
+# сколько мест вызова попадает в заголовок X-SQL-Profile
+SQL_PROFILER_TOP = int(os.getenv("SQL_PROFILER_TOP", 5))
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# модули, через которые проходит каждый запрос и которые не являются его источником
+_SKIPPED_FILES = {os.path.join(APP_DIR, name) for name in ("profiler.py", "metrics.py", "database.py", "replica.py")}
+
+
+# один SQL-запрос: текст, время выполнения и место в коде приложения, откуда он выполнен
+class ProfiledQuery(NamedTuple):
+    statement: str
+    seconds: float
+    origin: str
+
+
+# все SQL-запросы, выполненные внутри profile_queries()
+class QueryProfile:
+    def __init__(self):
+        self.queries: list[ProfiledQuery] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(query.seconds for query in self.queries)
+
+    # места вызова, отсортированные по числу запросов (несколько одинаковых запросов из одного места — признак N+1)
+    def by_origin(self) -> list[tuple[str, int, float]]:
+        counts = Counter(query.origin for query in self.queries)
+        seconds = Counter()
+        for query in self.queries:
+            seconds[query.origin] += query.seconds
+        return [(origin, count, seconds[origin]) for origin, count in counts.most_common()]
+
+    # краткий отчёт для заголовка: "news/service.py:120 list x1 0.8ms; ..."
+    def summary(self, top: int = SQL_PROFILER_TOP) -> str:
+        return "; ".join(f"{origin} x{count} {seconds * 1000:.1f}ms" for origin, count, seconds in self.by_origin()[:top])
+
+    # подробный отчёт: каждый запрос с временем и местом вызова
+    def report(self) -> str:
+        return "\n".join(
+            f"{query.seconds * 1000:8.2f} ms  {query.origin}  {' '.join(query.statement.split())}" for query in self.queries
+        )
+
+
+_profile: ContextVar[QueryProfile | None] = ContextVar("query_profile", default=None)
+
+'''Функция определения места вызова запроса: первый кадр стека из кода приложения (кроме служебных модулей)'''
+def query_origin() -> str:
+    # синхронный код SQLAlchemy выполняется в дочернем greenlet, а вызвавший его асинхронный код —
+    # в родительском, поэтому стек просматривается в обоих
+    current = greenlet.getcurrent()
+    for frame in (sys._getframe(1), current.parent.gr_frame if current.parent is not None else None):
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(APP_DIR) and filename not in _SKIPPED_FILES:
+                return f"{os.path.relpath(filename, APP_DIR)}:{frame.f_lineno} {frame.f_code.co_name}"
+            frame = frame.f_back
+    return "unknown"
+
+'''Функция учёта выполненного SQL-запроса (вызывается из событий движка, см. metrics.instrument_engine)'''
+def record_query(statement: str, seconds: float) -> None:
+    profile = _profile.get()
+    if profile is not None:
+        profile.queries.append(ProfiledQuery(statement, seconds, query_origin()))
+
+'''Функция профилирования всех SQL-запросов, выполненных внутри блока with'''
+@contextmanager
+def profile_queries() -> Iterator[QueryProfile]:
+    profile = QueryProfile()
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+'''Функция проверки бюджета SQL-запросов: блок with, выполнивший больше max_queries запросов, завершается ошибкой
+со списком запросов. Пример: with query_budget(2): await service.list(...)'''
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryProfile]:
+    with profile_queries() as profile:
+        yield profile
+    if profile.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{profile.count} SQL queries, budget is {max_queries}:\n{profile.report()}"
+        )
+
+
+# ASGI-middleware профилировщика: число и суммарное время SQL-запросов и главные места вызова
+# добавляются в заголовки ответа X-SQL-Queries, X-SQL-Time-ms и X-SQL-Profile, подробный отчёт пишется в лог
+class SQLProfilerMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        with profile_queries() as profile:
+
+            async def send_with_profile(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers["X-SQL-Queries"] = str(profile.count)
+                    headers["X-SQL-Time-ms"] = f"{profile.total_seconds * 1000:.2f}"
+                    if profile.queries:
+                        headers["X-SQL-Profile"] = profile.summary()
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile)
+        if profile.queries:
+            logger.debug(
+                "%s %s: %d SQL queries in %.2f ms (request %.2f ms)\n%s",
+                scope["method"], scope["path"], profile.count, profile.total_seconds * 1000,
+                (time.perf_counter() - started) * 1000, profile.report(),
+            )
@@ -0,0 +1,120 @@
+import logging
+import math
+import os
+from typing import Callable, NamedTuple
+
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, Request, status
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+from app.database import redis_client
+from app.depends import get_jwt_payload
+from app.user.schemas import UserLogin
+
+logger = logging.getLogger(__name__)
+
+# token bucket за один запрос к Redis: восполнение по времени сервера Redis (общему для всех воркеров),
+# списание токена и время до появления следующего, если токенов не хватает
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+# лимит: не больше capacity запросов подряд, восполняется полностью за period секунд
+class RateLimit(NamedTuple):
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+'''Функция чтения лимита из переменной окружения RATE_LIMIT_<NAME> в виде "запросы/секунды"; "0" отключает лимит'''
+def rate_limit_from_env(name: str, default: str) -> RateLimit | None:
+    value = os.getenv(f"RATE_LIMIT_{name.upper()}", default).strip()
+    if value in ("", "0"):
+        return None
+    capacity, _, period = value.partition("/")
+    return RateLimit(int(capacity), float(period or 1))
+
+
+load_dotenv()
+# попытки входа с одного IP-адреса и для одного логина
+LOGIN_IP_LIMIT = rate_limit_from_env("login_ip", "20/60")
+LOGIN_LIMIT = rate_limit_from_env("login", "5/60")
+# обновления refresh-токена с одного IP-адреса
+REFRESH_IP_LIMIT = rate_limit_from_env("refresh_ip", "60/60")
+# регистрации с одного IP-адреса
+REGISTER_IP_LIMIT = rate_limit_from_env("register_ip", "10/60")
+# изменяющие запросы одного пользователя (новости, комментарии, профиль, загрузка изображений)
+WRITE_USER_LIMIT = rate_limit_from_env("write_user", "60/60")
+
+
+# ограничитель запросов на token bucket в Redis, общий для всех воркеров.
+# Недоступность Redis не блокирует запросы: лимит в этом случае не применяется
+class RateLimiter:
+    def __init__(self, redis: AsyncRedis):
+        self.redis = redis
+        self._token_bucket = redis.register_script(TOKEN_BUCKET_LUA)
+
+    # списание токена; возвращает через сколько секунд повторить запрос или None, если запрос разрешён
+    async def hit(self, name: str, identity: str, limit: RateLimit) -> float | None:
+        try:
+            retry_after = float(await self._token_bucket(keys=[f"rate:{name}:{identity}"], args=[limit.capacity, limit.rate]))
+        except RedisError as e:
+            logger.warning("Rate limiter unavailable for %s: %s", name, e)
+            return None
+        return retry_after or None
+
+    # проверка лимита: при превышении запрос отклоняется с 429 и заголовком Retry-After
+    async def check(self, name: str, identity: str, limit: RateLimit | None) -> None:
+        if limit is None:
+            return
+        retry_after = await self.hit(name, identity, limit)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+
+rate_limiter = RateLimiter(redis_client)
+
+'''Функция получения IP-адреса клиента'''
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+'''Функция создания зависимости с лимитом по IP-адресу клиента'''
+def limit_by_ip(name: str, limit: RateLimit | None) -> Callable:
+    async def dependency(request: Request) -> None:
+        await rate_limiter.check(name, client_ip(request), limit)
+    return dependency
+
+'''Функция создания зависимости с лимитом по пользователю из JWT-токена'''
+def limit_by_user(name: str, limit: RateLimit | None) -> Callable:
+    async def dependency(jwt_payload = Depends(get_jwt_payload)) -> None:
+        await rate_limiter.check(name, str(jwt_payload["user_id"]), limit)
+    return dependency
+
+'''Зависимость для входа: лимиты по IP-адресу и по логину (подбор пароля к одному логину с разных адресов)'''
+async def login_rate_limit(payload: UserLogin, request: Request) -> None:
+    await rate_limiter.check("login_ip", client_ip(request), LOGIN_IP_LIMIT)
+    await rate_limiter.check("login", payload.login.lower(), LOGIN_LIMIT)
@@ -0,0 +1,111 @@
+import itertools
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncGenerator, AsyncIterator
+
+from dotenv import load_dotenv
+from fastapi import Depends
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import USER, PASSWORD, DB, PORT, AsyncSessionLocal, create_engine, get_db_session, redis_client
+from app.depends import get_optional_jwt_payload
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+# реплики для чтения через запятую (host или host:port); пусто — все запросы идут в основную базу
+REPLICA_HOSTS = [host.strip() for host in os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",") if host.strip()]
+# сколько секунд после изменения данных клиент читает из основной базы (read-your-writes)
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+'''Функция построения адреса реплики с теми же учётными данными и базой, что и у основной'''
+def replica_url(host: str) -> str:
+    host, _, port = host.partition(":")
+    return f"postgresql+asyncpg://{USER}:{PASSWORD}@{host}:{port or PORT}/{DB}"
+
+# реплики работают в режиме hot standby и сами отклоняют запись
+replica_engines = [create_engine(replica_url(host)) for host in REPLICA_HOSTS]
+ReplicaSessionLocals = [async_sessionmaker(bind=replica_engine) for replica_engine in replica_engines]
+_replicas = itertools.cycle(ReplicaSessionLocals)
+
+'''Функция выбора фабрики сессий для чтения: следующая реплика по кругу или основная база, если реплик нет'''
+def read_sessionmaker() -> async_sessionmaker:
+    return next(_replicas) if ReplicaSessionLocals else AsyncSessionLocal
+
+'''Функция получения сессии основной базы для заполнения общего кэша ответов: если запрос читает с реплики,
+открывается отдельная сессия основной базы. Иначе отставшие данные реплики попали бы в кэш сразу после его сброса
+при записи, и их получил бы даже закреплённый за основной базой клиент'''
+@asynccontextmanager
+async def primary_session(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    if session.bind not in replica_engines:
+        yield session
+        return
+    async with AsyncSessionLocal() as primary:
+        yield primary
+
+# ключ закрепления пользователя за основной базой после записи
+def pin_key(user_id) -> str:
+    return f"rw:pin:user:{user_id}"
+
+'''Функция закрепления пользователя за основной базой на READ_YOUR_WRITES_SECONDS'''
+async def pin_primary(user_id) -> None:
+    try:
+        await redis_client.set(pin_key(user_id), 1, ex=READ_YOUR_WRITES_SECONDS)
+    except RedisError as e:
+        logger.warning("Read-your-writes pin failed for user %s: %s", user_id, e)
+
+'''Функция проверки, закреплён ли пользователь за основной базой (при недоступности Redis — да, чтобы не отдать устаревшие данные)'''
+async def is_pinned(user_id) -> bool:
+    try:
+        return bool(await redis_client.exists(pin_key(user_id)))
+    except RedisError as e:
+        logger.warning("Read-your-writes check failed for user %s: %s", user_id, e)
+        return True
+
+'''Функция выбора фабрики сессий для чтения с учётом read-your-writes: закреплённый пользователь читает
+из основной базы, анонимные запросы (им нечего догонять) — с реплики без обращения к Redis'''
+async def read_sessionmaker_for(jwt_payload: dict | None) -> async_sessionmaker:
+    if jwt_payload is not None and await is_pinned(jwt_payload["user_id"]):
+        return AsyncSessionLocal
+    return read_sessionmaker()
+
+
+async def get_read_db_session(jwt_payload: dict | None = Depends(get_optional_jwt_payload)) -> AsyncGenerator[AsyncSession, None]:
+    sessionmaker = await read_sessionmaker_for(jwt_payload)
+    async with sessionmaker() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+
+
+# сессия только для чтения: реплика (по кругу) или основная база, если реплики не настроены
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db_session if ReplicaSessionLocals else get_db_session)]
+
+
+# ASGI-middleware read-your-writes: после успешного изменяющего запроса пользователь
+# на READ_YOUR_WRITES_SECONDS читает из основной базы, пока реплики догоняют её.
+# Пользователь берётся из payload, который уже проверили зависимости запроса (request.state);
+# запросы без авторизации (вход, регистрация) не закрепляются, иначе закреплялись бы все клиенты за общим NAT
+class ReadYourWritesMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_pinned(message: Message) -> None:
+            jwt_payload = scope.get("state", {}).get("jwt_payload")
+            if message["type"] == "http.response.start" and message["status"] < 400 and jwt_payload is not None:
+                await pin_primary(jwt_payload["user_id"])
+            await send(message)
+
+        await self.app(scope, receive, send_pinned)
@@ -0,0 +1,30 @@
+from typing import Any, Iterable, Mapping
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import Column
+
+'''Функция подписи столбцов вложенной сущности: столбец user_id автора становится author__user_id'''
+def nested_columns(prefix: str, *columns: Column) -> list:
+    return [column.label(f"{prefix}__{column.key}") for column in columns]
+
+'''Функция превращения строки Core-запроса в словарь, в котором подписанные столбцы
+(author__user_id, ...) собраны во вложенные словари (author: {user_id, ...})'''
+def nest_row(row: Mapping[str, Any]) -> dict:
+    result: dict = {}
+    for key, value in row.items():
+        prefix, separator, field = key.partition("__")
+        if separator:
+            result.setdefault(prefix, {})[field] = value
+        else:
+            result[key] = value
+    return result
+
+'''Функция сериализации данных в JSON напрямую через TypeAdapter: без ORM-объектов
+и без повторной проверки и кодирования ответа в FastAPI'''
+def dump_json(adapter: TypeAdapter, data: Any) -> bytes:
+    return adapter.dump_json(adapter.validate_python(data))
+
+'''Функция построения JSON-ответа из строк Core-запроса'''
+def rows_response(adapter: TypeAdapter, rows: Iterable[Mapping[str, Any]], headers: dict[str, str] | None = None) -> Response:
+    return Response(content=dump_json(adapter, [nest_row(row) for row in rows]), media_type="application/json", headers=headers)
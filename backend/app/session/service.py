@@ -1,18 +1,21 @@
 ﻿from fastapi import Response, Request, status, HTTPException
+import logging
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
 from sqlalchemy import select
 
-from app.database import SessionDep, redis_client
+from app.database import SessionDep
 from app.user.models import User
 from app.user.schemas import UserLogin
-from app.utils import check_password, create_jwt, generation_refresh_token
+from app.hashing import check_password
+from app.utils import create_jwt, generation_refresh_token
 from .schemas import SessionRefreshToken, SessionCreate, SessionAdminRead, SessionRead
-from collections.abc import AsyncIterator
+from .store import session_store
 
-import json
 import os
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 LIFETIME = int(os.environ["REFRESH_TOKEN_LIFETIME_DAYS"])
 
@@ -30,7 +33,7 @@ class SessionService:
         if user == None:
             return "This login is not registered"
         # проверка пароля
-        if not check_password(payload.password, user.password): 
+        if not await check_password(payload.password, user.password): 
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
         
         # создание JWT токена
@@ -48,12 +51,11 @@ class SessionService:
             "refresh_token_expiretime": (datetime.now(timezone.utc)+timedelta(days=LIFETIME)).isoformat()
         }
 
-        session_json = json.dumps(new_session)
         lifetime = LIFETIME * 24 * 60 * 60 # в секундах
         try:
-            await redis_client.setex(f"session:{user.user_id}:{refresh_token}", lifetime, session_json)
+            await session_store.create(new_session, lifetime)
         except Exception as e:
-            print(f"Ошибка подключения к Redis: {e}")
+            logger.error("Session store unavailable: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Ошибка подключения к серверу сессий. Убедитесь, что Redis запущен."
@@ -62,12 +64,7 @@ class SessionService:
     
     # получение списка сессий конкретного пользователя (для админа или для самого пользователя)
     async def list(self, user_id: int, Schema: SessionAdminRead | SessionRead) -> list[SessionAdminRead] | list[SessionRead]:
-        session_keys_iter: AsyncIterator[str] = redis_client.scan_iter(f"session:{user_id}:*") 
-        session_keys = [key async for key in session_keys_iter]
-        session_list = [
-            json.loads(session_data) for key in session_keys
-            if (session_data := await redis_client.get(key))
-        ]
+        session_list = await session_store.list(user_id)
         sessions = [Schema.model_validate(session) for session in session_list]
         return sessions
 
@@ -75,66 +72,35 @@ class SessionService:
     async def put(self, payload: SessionRefreshToken, response: Response, request: Request) -> SessionCreate | str:
 
         user_agent = request.headers.get("User-Agent")
-        refresh_token = payload.refresh_token
-        session_keys_iter: AsyncIterator[str] = redis_client.scan_iter(f"session:*:{refresh_token}") 
-        session_keys = [key async for key in session_keys_iter]
-        session_list = [
-            json.loads(session_data) for key in session_keys
-            if (session_data := await redis_client.get(key))
-        ]
+        new_refresh_token = generation_refresh_token()
+        lifetime = LIFETIME * 24 * 60 * 60 # в секундах
+        expiretime = (datetime.now(timezone.utc)+timedelta(days=LIFETIME)).isoformat()
 
-        if len(session_list) > 1:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Violation of referential integrity")
-        if len(session_list) == 0:
+        new_session = await session_store.rotate(payload.refresh_token, user_agent, new_refresh_token, expiretime, lifetime)
+        if new_session == "invalid":
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token is invalid")
-        key = session_keys[0]
-        session = session_list[0]
-        if session["user_agent"] != user_agent:
+        if new_session == "user_agent":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User-Agent is invalid")
-        
-        expiretime = datetime.fromisoformat(session["refresh_token_expiretime"])
-        if datetime.now(timezone.utc) > expiretime:
-            await redis_client.delete(key)
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The session expired. Log in again")
-        
-        user = await self.db.execute(select(User).where(User.user_id == session["user_id"]))
+
+        user = await self.db.execute(select(User).where(User.user_id == new_session["user_id"]))
         user = user.scalar_one_or_none()
         if not user:
+            await session_store.revoke(new_session["user_id"], new_refresh_token)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Refresh token not linked to user")
-        
-        new_refresh_token = generation_refresh_token()
-        jwt_token = create_jwt(session["user_id"], user.user_role)
-        response.headers["x-jwt"] = str(jwt_token)
-        
-        new_session = {
-            "user_id": user.user_id,
-            "user_agent": user_agent,
-            "refresh_token": new_refresh_token,
-            "refresh_token_expiretime": (datetime.now(timezone.utc)+timedelta(days=LIFETIME)).isoformat()
-        }
-
-        await redis_client.delete(key) # удаление старой сессии
 
-        session_json = json.dumps(new_session)
-        lifetime = LIFETIME * 24 * 60 * 60 # в секундах
-        await redis_client.setex(f"session:{user.user_id}:{new_refresh_token}", lifetime, session_json)
+        jwt_token = create_jwt(user.user_id, user.user_role)
+        response.headers["x-jwt"] = str(jwt_token)
         return SessionCreate.model_validate(new_session)
 
     # удаление сессии (выход)
     async def delete(self, request: Request, jwt_payload) -> None | str:
         user_id = jwt_payload['user_id']
-        session_keys_iter: AsyncIterator[str] = redis_client.scan_iter(f"session:{user_id}:*")
-        session_keys = [key async for key in session_keys_iter]
-        session_list = [
-            json.loads(session_data) for key in session_keys
-            if (session_data := await redis_client.get(key))
-        ]
+        session_list = await session_store.list(user_id)
         if session_list == []:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
         user_agent = request.headers.get("User-Agent")
-        for i in range(len(session_keys)):
-            one_session = session_list[i]
+        for one_session in session_list:
             if one_session["user_agent"] == user_agent:
-                await redis_client.delete(session_keys[i])
+                await session_store.revoke(user_id, one_session["refresh_token"])
                 return "The session was successfully deleted"
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Your User Agent was not found")
\ No newline at end of file
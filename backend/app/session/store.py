@@ -0,0 +1,109 @@
+import json
+
+from redis.asyncio import Redis as AsyncRedis
+
+from app.database import redis_client
+
+# сессия хранится по ключу своего refresh токена, а у пользователя есть множество его refresh токенов
+def session_key(refresh_token: str) -> str:
+    return f"session:{refresh_token}"
+
+def user_sessions_key(user_id: int | str) -> str:
+    return f"user_sessions:{user_id}"
+
+# атомарная ротация refresh токена за один запрос к Redis:
+# поиск сессии по старому токену, проверка User-Agent, удаление старой сессии и запись новой
+ROTATE_SESSION_LUA = """
+local data = redis.call('GET', KEYS[1])
+if not data then
+    return {'invalid'}
+end
+local session = cjson.decode(data)
+local user_agent = session['user_agent']
+if user_agent == cjson.null then
+    user_agent = ''
+end
+if user_agent ~= ARGV[1] then
+    return {'user_agent'}
+end
+local user_key = 'user_sessions:' .. session['user_id']
+redis.call('UNLINK', KEYS[1])
+redis.call('SREM', user_key, ARGV[5])
+session['refresh_token'] = ARGV[2]
+session['refresh_token_expiretime'] = ARGV[3]
+local new_data = cjson.encode(session)
+redis.call('SET', 'session:' .. ARGV[2], new_data, 'EX', ARGV[4])
+redis.call('SADD', user_key, ARGV[2])
+redis.call('EXPIRE', user_key, ARGV[4])
+return {'ok', new_data}
+"""
+
+# удаление всех сессий пользователя за один запрос к Redis, независимо от их количества
+REVOKE_ALL_LUA = """
+local tokens = redis.call('SMEMBERS', KEYS[1])
+local batch = {}
+for i, token in ipairs(tokens) do
+    batch[#batch + 1] = 'session:' .. token
+    if #batch == 1000 then
+        redis.call('UNLINK', unpack(batch))
+        batch = {}
+    end
+end
+if #batch > 0 then
+    redis.call('UNLINK', unpack(batch))
+end
+redis.call('UNLINK', KEYS[1])
+return #tokens
+"""
+
+
+# хранилище сессий в Redis: любая операция над сессиями пользователя занимает постоянное число запросов
+class SessionStore:
+    def __init__(self, redis: AsyncRedis):
+        self.redis = redis
+        self._rotate = redis.register_script(ROTATE_SESSION_LUA)
+        self._revoke_all = redis.register_script(REVOKE_ALL_LUA)
+
+    # сохранение новой сессии
+    async def create(self, session: dict, lifetime: int) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.setex(session_key(session["refresh_token"]), lifetime, json.dumps(session))
+            pipe.sadd(user_sessions_key(session["user_id"]), session["refresh_token"])
+            pipe.expire(user_sessions_key(session["user_id"]), lifetime)
+            await pipe.execute()
+
+    # получение всех сессий пользователя: SMEMBERS и один MGET
+    async def list(self, user_id: int | str) -> list[dict]:
+        refresh_tokens = list(await self.redis.smembers(user_sessions_key(user_id)))
+        if not refresh_tokens:
+            return []
+        values = await self.redis.mget([session_key(refresh_token) for refresh_token in refresh_tokens])
+        # токены истёкших по TTL сессий убираются из множества пользователя
+        expired = [refresh_token for refresh_token, value in zip(refresh_tokens, values) if value is None]
+        if expired:
+            await self.redis.srem(user_sessions_key(user_id), *expired)
+        return [json.loads(value) for value in values if value is not None]
+
+    # ротация refresh токена; возвращает новую сессию или причину отказа ("invalid" или "user_agent")
+    async def rotate(self, refresh_token: str, user_agent: str | None, new_refresh_token: str, expiretime: str, lifetime: int) -> dict | str:
+        result = await self._rotate(
+            keys=[session_key(refresh_token)],
+            args=[user_agent or "", new_refresh_token, expiretime, lifetime, refresh_token],
+        )
+        if result[0] != "ok":
+            return result[0]
+        return json.loads(result[1])
+
+    # удаление отдельных сессий пользователя одним UNLINK
+    async def revoke(self, user_id: int | str, *refresh_tokens: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.unlink(*[session_key(refresh_token) for refresh_token in refresh_tokens])
+            pipe.srem(user_sessions_key(user_id), *refresh_tokens)
+            await pipe.execute()
+
+    # удаление всех сессий пользователя (на всех устройствах); возвращает их количество
+    async def revoke_all(self, user_id: int | str) -> int:
+        return await self._revoke_all(keys=[user_sessions_key(user_id)])
+
+
+session_store = SessionStore(redis_client)
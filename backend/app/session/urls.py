@@ -3,13 +3,15 @@ from .schemas import SessionCreate, SessionRead, SessionAdminRead, SessionRefres
 from app.user.schemas import UserLogin
 from .service import SessionService
 from app.depends import get_jwt_payload, is_admin, is_same_user
+from app.rate_limit import REFRESH_IP_LIMIT, limit_by_ip, login_rate_limit
 
 router = APIRouter(tags=["sessions"])
 
 async def session_service(service: SessionService = Depends()) -> SessionService:
     return service
 
-@router.post("/", response_model=SessionCreate | str)
+# лимиты проверяются до проверки пароля (Argon2)
+@router.post("/", response_model=SessionCreate | str, dependencies=[Depends(login_rate_limit)])
 async def login(payload: UserLogin, response: Response, request: Request, service: SessionService = Depends(session_service)):
     return await service.create(payload, response, request)
 
@@ -21,7 +23,7 @@ async def get_sessions_by_user_id_for_admin(user_id: int, service: SessionServic
 async def get_sessions_by_user_id_for_user(user_id: int, service: SessionService = Depends(session_service), _ = Depends(is_same_user)):
     return await service.list(user_id, SessionRead)
 
-@router.put("/", response_model=SessionCreate | str)
+@router.put("/", response_model=SessionCreate | str, dependencies=[Depends(limit_by_ip("refresh_ip", REFRESH_IP_LIMIT))])
 async def refresh(payload: SessionRefreshToken, response: Response, request: Request, service: SessionService = Depends(session_service)):
     return await service.put(payload, response, request)
 
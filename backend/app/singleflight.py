@@ -0,0 +1,41 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+# объединение одинаковых одновременных загрузок внутри воркера: пока загрузка по ключу выполняется,
+# остальные вызовы с тем же ключом ждут её и получают тот же результат (или то же исключение)
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    # выполнение loader() или ожидание уже выполняющейся загрузки с тем же ключом;
+    # возвращает результат и признак того, что он получен от другого вызова
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        while (future := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                # загрузку отменили вместе с запросом, который её выполнял, — загрузку выполняет следующий ожидающий
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # исключение уже передаётся вызвавшему; без этого при отсутствии ожидающих asyncio предупредит о нём в логе
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
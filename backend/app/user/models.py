@@ -13,6 +13,7 @@ class User(Base):
     avatar = Column(String, nullable=True)
     user_role = Column(String, default="user")
     password = Column(String, nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
-    news = relationship("News", back_populates="author")
-    comment = relationship("Comment", back_populates="author")
\ No newline at end of file
+    news = relationship("News", back_populates="author", lazy="raise")
+    comment = relationship("Comment", back_populates="author", lazy="raise")
\ No newline at end of file
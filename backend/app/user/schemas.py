@@ -2,7 +2,9 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, computed_field, field_validator
+
+from app.media.storage import media_variants
 
 
 class UserBase(BaseModel):
@@ -49,7 +51,25 @@ class UserRead(UserBase):
     registration_date: datetime
     model_config = ConfigDict(from_attributes=True)
 
+    # URL готовых вариантов аватара (если он загружен через /media/)
+    @computed_field
+    @property
+    def avatar_variants(self) -> Optional[dict[str, dict[str, str]]]:
+        return media_variants(self.avatar)
+
 
 class UserLogin(BaseModel):
     login: str
     password: str
+
+
+# строка выгрузки пользователей (без хэша пароля)
+class UserExport(BaseModel):
+    user_id: int
+    user_name: str
+    login: str
+    user_role: Optional[str] = None
+    avatar: Optional[str] = None
+    registration_date: Optional[datetime] = None
+    updated_at: datetime
+    model_config = ConfigDict(from_attributes=True)
@@ -1,11 +1,26 @@
 ﻿from typing import Sequence
-from fastapi import HTTPException, status
-from sqlalchemy import select
+from datetime import datetime
+from fastapi import HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import raiseload
 
-from app.database import SessionDep, redis_client
+from app.database import SessionDep
+from app.export import ndjson_response
+from app.serialization import rows_response
 from .models import User
-from .schemas import UserCreate, UserUpdate
-from app.utils import hash_password
+from .schemas import UserCreate, UserUpdate, UserRead, UserExport
+from app.hashing import hash_password
+from app.session.store import session_store
+from app.jwt_cache import revoke_user_tokens
+
+user_list_adapter = TypeAdapter(list[UserRead])
+
+'''Функция получения столбцов UserRead для чтения пользователей без ORM-объектов'''
+def user_read_columns() -> tuple:
+    return (User.user_id, User.user_name, User.login, User.user_role, User.avatar, User.password, User.registration_date)
 
 class UserService:
     def __init__(self, db: SessionDep):
@@ -17,20 +32,28 @@ class UserService:
         existing_user = await self.db.execute(select(User).where(User.login == payload.login))
         if existing_user.scalar_one_or_none():
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Login already registered")
-        payload.password = hash_password(payload.password)
+        payload.password = await hash_password(payload.password)
         new_user = User(**payload.model_dump())
         self.db.add(new_user)
         await self.db.commit()
         await self.db.refresh(new_user)
         return new_user
 
-    # чтение списка пользователей
-    async def list(self) -> Sequence[User]:
-        users = await self.db.execute(select(User))
-        users_list = users.scalars().all()
+    # чтение списка пользователей (строки Core-запроса сериализуются сразу в JSON)
+    async def list(self) -> Response:
+        users = await self.db.execute(select(*user_read_columns()))
+        users_list = users.mappings().all()
         if not users_list:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No users found")
-        return users_list
+        return rows_response(user_list_adapter, users_list)
+
+    # потоковая выгрузка пользователей в NDJSON (при указании since — только изменённых с этого момента)
+    @staticmethod
+    def export(since: datetime | None = None) -> StreamingResponse:
+        query = select(User).options(raiseload("*")).order_by(User.user_id)
+        if since is not None:
+            query = query.where(User.updated_at >= since)
+        return ndjson_response(query, UserExport, "users.ndjson")
 
     # чтение пользователя по индексу
     async def get(self, user_id: int) -> User:
@@ -54,7 +77,7 @@ class UserService:
             if existing_user.scalar_one_or_none():
                 raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Login already registered")
         if 'password' in update_data and update_data['password']:
-            update_data['password'] = hash_password(update_data['password'])
+            update_data['password'] = await hash_password(update_data['password'])
         elif 'password' in update_data:
             del update_data['password']
         for field, value in update_data.items():
@@ -62,23 +85,21 @@ class UserService:
         await self.db.commit()
         await self.db.refresh(user)
         # при обновлении данных о пользователе удаляем все его активные сессии, если были
-        session_keys_iter = redis_client.scan_iter(f"session:{user.user_id}:*")
-        session_keys = [key async for key in session_keys_iter]
-        if session_keys != []:
-            for key in session_keys: await redis_client.delete(key)
+        await session_store.revoke_all(user_id)
+        await revoke_user_tokens(user_id)
         return user
 
-    # удаление пользователя
+    # удаление пользователя без загрузки его новостей и комментариев (ссылки проверяет внешний ключ по индексам author_id)
     async def delete(self, user_id: int) -> str:
-        user = await self.db.execute(select(User).where(User.user_id == user_id))
-        user = user.scalar_one_or_none()
-        if not user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-        await self.db.delete(user)
-        await self.db.commit()
+        try:
+            deleted = await self.db.execute(delete(User).where(User.user_id == user_id).returning(User.user_id))
+            if deleted.scalar_one_or_none() is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User has news or comments")
         # при удалении пользователя удаляем все его активные сессии, если были
-        session_keys_iter = redis_client.scan_iter(f"session:{user.user_id}:*")
-        session_keys = [key async for key in session_keys_iter]
-        if session_keys != []:
-            for key in session_keys: await redis_client.delete(key)
+        await session_store.revoke_all(user_id)
+        await revoke_user_tokens(user_id)
         return "The user was successfully deleted"
\ No newline at end of file
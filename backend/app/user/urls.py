@@ -1,29 +1,46 @@
-﻿from fastapi import APIRouter, Depends
+﻿from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from .schemas import UserCreate, UserRead, UserUpdate
 from .service import UserService
+from app.replica import ReadSessionDep
 from app.depends import is_admin, same_user_or_admin
+from app.rate_limit import REGISTER_IP_LIMIT, WRITE_USER_LIMIT, limit_by_ip, limit_by_user
 
-router = APIRouter(tags=["users"])
+router = APIRouter(tags=["users"], default_response_class=ORJSONResponse)
 
 async def user_service(service: UserService = Depends()) -> UserService:
     return service
 
-@router.post("/", response_model=UserRead | str)
+# сервис для GET-запросов: сессия на реплике для чтения
+async def user_reader(db: ReadSessionDep) -> UserService:
+    return UserService(db)
+
+# лимиты изменяющих запросов (проверяются до хэширования пароля и обращений к базе данных)
+register_limit = Depends(limit_by_ip("register_ip", REGISTER_IP_LIMIT))
+write_limit = Depends(limit_by_user("write_user", WRITE_USER_LIMIT))
+
+@router.post("/", response_model=UserRead | str, dependencies=[register_limit])
 async def register_user(payload: UserCreate, service: UserService = Depends(user_service)):
     return await service.create(payload)
 
 @router.get("/", response_model=list[UserRead])
-async def get_users(service: UserService = Depends(user_service), _ = Depends(is_admin)):
+async def get_users(service: UserService = Depends(user_reader), _ = Depends(is_admin)):
     return await service.list()
 
+@router.get("/export", response_class=StreamingResponse)
+async def export_users(since: Optional[datetime] = None, _ = Depends(is_admin)):
+    return UserService.export(since)
+
 @router.get("/{user_id}", response_model=UserRead)
-async def get_user_by_id(user_id: int, service: UserService = Depends(user_service), _ = Depends(same_user_or_admin)):
+async def get_user_by_id(user_id: int, service: UserService = Depends(user_reader), _ = Depends(same_user_or_admin)):
     return await service.get(user_id)
 
-@router.put("/{user_id}", response_model=UserRead)
+@router.put("/{user_id}", response_model=UserRead, dependencies=[write_limit])
 async def update_user(user_id: int, payload: UserUpdate, service: UserService = Depends(user_service), _ = Depends(same_user_or_admin)):
     return await service.update(user_id, payload)
 
-@router.delete("/{user_id}", response_model=str)
+@router.delete("/{user_id}", response_model=str, dependencies=[write_limit])
 async def delete_user(user_id: int, service: UserService = Depends(user_service), _ = Depends(same_user_or_admin)):
     return await service.delete(user_id)
\ No newline at end of file
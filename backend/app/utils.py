@@ -1,27 +1,14 @@
-from argon2 import PasswordHasher
 from jwt import InvalidSignatureError, ExpiredSignatureError, InvalidTokenError
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
+import base64
+import json
+import math
 import jwt
 import random
 import string
 import os
 
-ph = PasswordHasher()
-
-"""Функция для хэширования пароля"""
-
-def hash_password(password: str) -> str:
-    return ph.hash(password)
-
-'''Функция для проверки пароля'''
-def check_password(password: str, hashed_password: str) -> bool:
-    try:
-        ph.verify(hashed_password, password)
-        return True
-    except Exception:
-        return False
-
 load_dotenv()
 SECRET_KEY = os.environ["JWT_SECRET_KEY"]
 LIFETIME = int(os.environ["JWT_LIFETIME_MINUTES"])
@@ -30,6 +17,8 @@ LIFETIME = int(os.environ["JWT_LIFETIME_MINUTES"])
 def create_jwt(user_id: int, user_role: str, secret_key: str = SECRET_KEY, lifetime: int = LIFETIME):
     jwt_token = jwt.encode({"user_id": str(user_id),
                                 "user_role": user_role,
+                                # время выпуска с долями секунды: токены, выпущенные до отзыва, отличаются от выпущенных сразу после него
+                                "iat": datetime.now(timezone.utc).timestamp(),
                                 "exp": datetime.now(timezone.utc) + timedelta(minutes=lifetime)}, 
                                 secret_key, algorithm="HS256")
     return jwt_token
@@ -50,4 +39,49 @@ def check_jwt(jwt_token: str, secret_key: str = SECRET_KEY):
 def generation_refresh_token() -> str:
     characters = string.ascii_letters + string.digits
     refresh_token = ''.join(random.choices(characters, k=32))
-    return refresh_token
\ No newline at end of file
+    return refresh_token
+
+'''Функция кодирования курсора пагинации (значений ключа последней строки страницы)'''
+def encode_cursor(*values) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+'''Функция декодирования курсора пагинации'''
+def decode_cursor(cursor: str) -> list | None:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values
+
+
+'''Функция декодирования курсора вида (дата, идентификатор); None, если курсор некорректен'''
+def decode_date_id_cursor(cursor: str) -> tuple[datetime, int] | None:
+    values = decode_cursor(cursor)
+    try:
+        date, entity_id = values
+        return datetime.fromisoformat(date), int(entity_id)
+    except (ValueError, TypeError):
+        return None
+
+'''Функция декодирования курсора вида (число, идентификатор); None, если курсор некорректен'''
+def decode_int_id_cursor(cursor: str) -> tuple[int, int] | None:
+    values = decode_cursor(cursor)
+    try:
+        number, entity_id = values
+        return int(number), int(entity_id)
+    except (ValueError, TypeError):
+        return None
+
+'''Функция декодирования курсора вида (релевантность, идентификатор); None, если курсор некорректен'''
+def decode_rank_id_cursor(cursor: str) -> tuple[float, int] | None:
+    values = decode_cursor(cursor)
+    try:
+        rank, entity_id = values
+        rank, entity_id = float(rank), int(entity_id)
+    except (ValueError, TypeError):
+        return None
+    # json допускает NaN и Infinity, но в курсоре они бессмысленны
+    return (rank, entity_id) if math.isfinite(rank) else None
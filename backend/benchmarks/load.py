@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, NamedTuple
+
+import httpx
+from sqlalchemy import delete, insert, select
+
+# все запросы через ASGITransport приходят с 127.0.0.1, поэтому ограничение частоты запросов
+# (app.rate_limit) отключается до импорта приложения, иначе вход и обновление токена упирались бы в 429
+for name in ("LOGIN_IP", "LOGIN", "REFRESH_IP", "REGISTER_IP", "WRITE_USER"):
+    os.environ[f"RATE_LIMIT_{name}"] = "0"
+
+from app.comment.models import Comment
+from app.database import AsyncSessionLocal
+from app.hashing import hash_password
+from app.main import app
+from app.news.models import News
+from app.session.store import session_store
+from app.user.models import User
+
+# Нагрузочный замер API внутри процесса: ASGI-приложение вызывается напрямую через httpx.ASGITransport
+# (без сети и uvicorn), но с настоящими PostgreSQL и Redis из .env. Перед замером в базу добавляются
+# пользователи, новости и комментарии, после замера они удаляются (--keep оставляет их).
+# Лучше запускать на отдельной базе. Запуск из каталога backend:
+#   python -m benchmarks.load --news 1000 --comments 20 --requests 500 --concurrency 20 --output results.json
+#   python -m benchmarks.load --output new.json --baseline results.json --max-regression 10
+
+SCENARIOS = ("login", "refresh", "feed", "news", "comments")
+BENCH_PASSWORD = "Bench1!pass"
+HEADERS = {"User-Agent": "news-service-benchmark"}
+SEED_BATCH_SIZE = 1000
+OK_STATUSES = (200, 304)
+
+
+class Dataset(NamedTuple):
+    user_ids: list[int]
+    logins: list[str]
+    news_ids: list[int]
+
+
+'''Функция заполнения базы тестовыми данными: users пользователей-авторов, news новостей и по comments комментариев к каждой'''
+async def seed(users: int, news: int, comments: int) -> Dataset:
+    run_id = int(time.time())
+    password = await hash_password(BENCH_PASSWORD)
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        user_rows = [
+            {"user_name": f"Bench {i}", "login": f"bench_{run_id}_{i}", "user_role": "author", "password": password, "registration_date": now}
+            for i in range(users)
+        ]
+        user_ids = list((await db.execute(insert(User).returning(User.user_id), user_rows)).scalars())
+        news_ids = []
+        for start in range(0, news, SEED_BATCH_SIZE):
+            news_rows = [
+                {
+                    "header": f"Новость номер {i} для нагрузочного теста",
+                    "content": {"blocks": [{"type": "paragraph", "text": "Текст новости для нагрузочного теста. " * 10}]},
+                    "publication_date": now - timedelta(minutes=i),
+                    "author_id": user_ids[i % users],
+                    "comment_count": comments,
+                }
+                for i in range(start, min(start + SEED_BATCH_SIZE, news))
+            ]
+            news_ids += list((await db.execute(insert(News).returning(News.news_id), news_rows)).scalars())
+        comment_rows = [
+            {"text": f"Комментарий {j}", "news_id": news_id, "author_id": user_ids[j % users], "publication_date": now + timedelta(seconds=j)}
+            for news_id in news_ids for j in range(comments)
+        ]
+        for start in range(0, len(comment_rows), SEED_BATCH_SIZE):
+            await db.execute(insert(Comment), comment_rows[start:start + SEED_BATCH_SIZE])
+        await db.commit()
+    return Dataset(user_ids, [row["login"] for row in user_rows], news_ids)
+
+'''Функция удаления тестовых данных и сессий тестовых пользователей'''
+async def cleanup(dataset: Dataset) -> None:
+    async with AsyncSessionLocal() as db:
+        news_ids = select(News.news_id).where(News.author_id.in_(dataset.user_ids))
+        await db.execute(delete(Comment).where(Comment.news_id.in_(news_ids) | Comment.author_id.in_(dataset.user_ids)))
+        await db.execute(delete(News).where(News.author_id.in_(dataset.user_ids)))
+        await db.execute(delete(User).where(User.user_id.in_(dataset.user_ids)))
+        await db.commit()
+    for user_id in dataset.user_ids:
+        await session_store.revoke_all(user_id)
+
+'''Функция входа тестового пользователя, возвращает ответ POST /session/'''
+async def login(client: httpx.AsyncClient, dataset: Dataset) -> httpx.Response:
+    payload = {"login": random.choice(dataset.logins), "password": BENCH_PASSWORD}
+    return await client.post("/session/", json=payload, headers=HEADERS)
+
+'''Функция построения запроса сценария для одного виртуального клиента (со своим состоянием: refresh-токен, курсор ленты)'''
+async def make_request(client: httpx.AsyncClient, scenario: str, dataset: Dataset) -> Callable[[], Awaitable[httpx.Response]]:
+    if scenario == "login":
+        return lambda: login(client, dataset)
+    if scenario == "refresh":
+        response = await login(client, dataset)
+        if response.status_code != 200:
+            raise RuntimeError(f"login for refresh scenario failed: {response.status_code} {response.text}")
+        refresh_token = response.json()["refresh_token"]
+
+        async def refresh() -> httpx.Response:
+            nonlocal refresh_token
+            response = await client.put("/session/", json={"refresh_token": refresh_token}, headers=HEADERS)
+            if response.status_code == 200:
+                refresh_token = response.json()["refresh_token"]
+            return response
+        return refresh
+    if scenario == "feed":
+        cursor = None
+
+        async def feed() -> httpx.Response:
+            nonlocal cursor
+            params = {"limit": 20} | ({"cursor": cursor} if cursor else {})
+            response = await client.get("/news/", params=params)
+            cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+            return response
+        return feed
+    if scenario == "news":
+        return lambda: client.get(f"/news/{random.choice(dataset.news_ids)}")
+    return lambda: client.get(f"/comment/news/{random.choice(dataset.news_ids)}", params={"limit": 50})
+
+'''Функция вычисления процентиля (в миллисекундах)'''
+def percentile(latencies: list[float], q: int) -> float:
+    if len(latencies) < 2:
+        return round(latencies[0] * 1000, 3) if latencies else 0.0
+    return round(statistics.quantiles(latencies, n=100, method="inclusive")[q - 1] * 1000, 3)
+
+'''Функция замера сценария: requests запросов от concurrency параллельных клиентов (после warmup запросов прогрева)'''
+async def run_scenario(client: httpx.AsyncClient, scenario: str, dataset: Dataset, requests: int, concurrency: int, warmup: int) -> dict:
+    workers = [await make_request(client, scenario, dataset) for _ in range(concurrency)]
+    for i in range(warmup):
+        await workers[i % concurrency]()
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker(request: Callable[[], Awaitable[httpx.Response]], count: int) -> None:
+        nonlocal errors
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await request()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code not in OK_STATUSES:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        worker(request, requests // concurrency + (1 if i < requests % concurrency else 0)) for i, request in enumerate(workers)
+    ))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+'''Функция сравнения с сохранённым замером: печатает изменения и возвращает False, если падение rps
+или рост p95 больше max_regression процентов'''
+def compare(results: dict, baseline: dict, max_regression: float | None) -> bool:
+    ok = True
+    print(f"\n{'scenario':10} {'rps':>18} {'p95 ms':>22}")
+    for scenario, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if previous is None:
+            continue
+        rps_change = (current["rps"] - previous["rps"]) / previous["rps"] * 100 if previous["rps"] else 0.0
+        p95_change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100 if previous["p95_ms"] else 0.0
+        regressed = max_regression is not None and (rps_change < -max_regression or p95_change > max_regression)
+        ok = ok and not regressed
+        print(
+            f"{scenario:10} {previous['rps']:8} → {current['rps']:<8} ({rps_change:+.1f}%)"
+            f" {previous['p95_ms']:8} → {current['p95_ms']:<8} ({p95_change:+.1f}%){'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+async def run(args: argparse.Namespace) -> dict:
+    dataset = await seed(args.users, args.news, args.comments)
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                scenarios = {}
+                for scenario in args.scenarios:
+                    scenarios[scenario] = await run_scenario(client, scenario, dataset, args.requests, args.concurrency, args.warmup)
+                    print(f"{scenario:10} {json.dumps(scenarios[scenario])}")
+    finally:
+        if not args.keep:
+            await cleanup(dataset)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {key: getattr(args, key) for key in ("users", "news", "comments", "requests", "concurrency", "warmup")},
+        "scenarios": scenarios,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный замер API (p50/p95/p99 и запросы в секунду)")
+    parser.add_argument("--users", type=int, default=20, help="число тестовых пользователей")
+    parser.add_argument("--news", type=int, default=1000, help="число тестовых новостей")
+    parser.add_argument("--comments", type=int, default=20, help="число комментариев к каждой новости")
+    parser.add_argument("--requests", type=int, default=500, help="число замеряемых запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=20, help="число параллельных клиентов")
+    parser.add_argument("--warmup", type=int, default=20, help="число запросов прогрева на сценарий")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", help="JSON предыдущего замера для сравнения")
+    parser.add_argument("--max-regression", type=float, help="допустимое ухудшение rps и p95 в процентах (иначе код выхода 1)")
+    parser.add_argument("--keep", action="store_true", help="не удалять тестовые данные после замера")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
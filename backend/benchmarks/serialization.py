@@ -0,0 +1,76 @@
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.news.schemas import NewsPage
+
+# Синтетический замер сериализации страницы новостей (без базы данных):
+#   orm      — ORM-подобные объекты, NewsPage.model_validate + model_dump + json.dumps (как раньше делал JSONResponse в FastAPI)
+#   core     — словари из строк Core-запроса, TypeAdapter(NewsPage).dump_json (текущий путь списков)
+#   orjson   — те же словари, TypeAdapter.dump_python + orjson.dumps (как ORJSONResponse)
+# Запуск из каталога backend: python -m benchmarks.serialization --items 100
+
+
+class _Row:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+'''Функция генерации страницы новостей в виде словарей (как после nest_row)'''
+def make_rows(items: int) -> list[dict]:
+    now = datetime(2026, 1, 1)
+    return [
+        {
+            "news_id": i,
+            "header": f"Новость {i}",
+            "content": {"blocks": [{"type": "paragraph", "text": "Текст новости " * 20}]},
+            "cover": f"media/{i:064x}/original.jpg",
+            "publication_date": now - timedelta(minutes=i),
+            "author_id": i % 10,
+            "comment_count": i * 3,
+            "author": {
+                "user_id": i % 10,
+                "user_name": f"Автор {i % 10}",
+                "login": f"author{i % 10}",
+                "user_role": "author",
+                "avatar": None,
+                "password": "$argon2id$v=19$m=65536,t=3,p=4$SALT$HASH",
+                "registration_date": now,
+            },
+        }
+        for i in range(items)
+    ]
+
+'''Функция превращения словарей в объекты с атрибутами (как ORM-объекты для from_attributes)'''
+def make_objects(rows: list[dict]) -> list[_Row]:
+    return [_Row(**{**row, "author": _Row(**row["author"])}) for row in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер сериализации страницы новостей")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(NewsPage)
+    rows = make_rows(args.items)
+    objects = make_objects(rows)
+    cases = {
+        "orm": lambda: json.dumps(
+            NewsPage.model_validate({"items": objects, "next_cursor": None}, from_attributes=True).model_dump(mode="json"),
+            ensure_ascii=False, separators=(",", ":"),
+        ).encode(),
+        "core": lambda: adapter.dump_json(adapter.validate_python({"items": rows, "next_cursor": None})),
+        "orjson": lambda: orjson.dumps(adapter.dump_python(adapter.validate_python({"items": rows, "next_cursor": None}))),
+    }
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=args.repeat, repeat=3)) / args.repeat
+        print(f"{name:8} {seconds * 1000:8.3f} ms/page  {len(case()):8} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
+import asyncio
+import json
 import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import httpx
 import psycopg2
 import pytest
 from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+
+from app.cache import CachedResponse, comments_cache_tag, news_cache_key, response_cache
+from app.comment.service import CommentService
+from app.database import AsyncSessionLocal, engine, redis_cache_client, redis_client
+from app.hashing import PasswordHashPool
+from app.media.storage import write_atomic
+from app.news.service import NewsService
+from app.news.view_counter import FLUSHING_KEY, PENDING_KEY, view_counter
+from app.profiler import query_budget
+from app.replica import ReadYourWritesMiddleware, is_pinned, pin_key, read_sessionmaker_for
 
 load_dotenv()
 USER = os.environ["POSTGRES_USER"]
@@ -24,6 +40,13 @@ TEST_LOGINS = [
     "test_user_1",
     "duplicate_test",
     "weak",
+    "revoke_test",
+    "search_author",
+    "count_author",
+    "bulk_admin",
+    "etag_author",
+    "budget_author",
+    "views_author",
 ]
 
 
@@ -45,6 +68,19 @@ def clean_db_before_each_test():
     yield
 
 
+# Асинхронные тесты выполняются в asyncio, как и само приложение
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+# Закрывает соединения приложения с базой и Redis: они привязаны к event loop, а у каждого асинхронного теста он свой
+async def close_app_pools():
+    await engine.dispose()
+    await redis_client.connection_pool.disconnect()
+    await redis_cache_client.connection_pool.disconnect()
+
+
 @pytest.fixture
 def client():
     with httpx.Client(base_url=BASE_URL) as c:
@@ -112,3 +148,357 @@ def test_weak_password_registration(client):
     assert response.status_code == 422, (
         "Слабый пароль был принят! Ожидался статус 422 (ошибка валидации)."
     )
+
+
+# Тест 4: Пагинация ленты новостей
+def test_news_feed_pagination(client):
+    response = client.get("/news/", params={"limit": 1})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert len(data["items"]) <= 1
+    if data["next_cursor"]:
+        next_page = client.get("/news/", params={"limit": 1, "cursor": data["next_cursor"]})
+        assert next_page.status_code == 200
+        assert next_page.json()["items"][0]["news_id"] != data["items"][0]["news_id"]
+
+    bad_cursor = client.get("/news/", params={"cursor": "not-a-cursor"})
+    assert bad_cursor.status_code == 400
+
+
+# Тест 5: Условный GET новости возвращает 304 без тела
+def test_news_conditional_get(client):
+    news_id = client.get("/news/", params={"limit": 1}).json()["items"][0]["news_id"]
+    response = client.get(f"/news/{news_id}")
+    assert response.status_code == 200
+    assert "etag" in response.headers
+    assert "last-modified" in response.headers
+
+    not_modified = client.get(f"/news/{news_id}", headers={"If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == response.headers["etag"]
+
+
+# Тест 6: Полнотекстовый поиск находит новость по слову из заголовка в другой словоформе
+def test_news_search(client):
+    password = "StrongPassword123!"
+    author = {"user_name": "search_author", "login": "search_author", "user_role": "author", "password": password}
+    assert client.post("/user/", json=author).status_code == 200
+    session = client.post("/session/", json={"login": "search_author", "password": password})
+    headers = {"Authorization": f"Bearer {session.headers['x-jwt']}"}
+    news = client.post("/news/", json={"header": "Землетрясения в горах Памира", "content": {"blocks": []}}, headers=headers)
+    assert news.status_code == 200
+    news_id = news.json()["news_id"]
+    try:
+        # в заголовке множественное число, в запросе — единственное: совпадают только основы слов
+        response = client.get("/news/search", params={"q": "землетрясение"})
+        assert response.status_code == 200
+        assert news_id in [item["news_id"] for item in response.json()["items"]]
+    finally:
+        client.delete(f"/news/{news_id}", headers=headers)
+
+    empty = client.get("/news/search", params={"q": "несуществующееслово"})
+    assert empty.status_code == 200
+    assert empty.json()["items"] == []
+
+
+# Тест 7: Чтение ленты, новости и комментариев укладывается в бюджет SQL-запросов (без N+1)
+@pytest.mark.anyio
+async def test_read_query_budget(client):
+    password = "StrongPassword123!"
+    author = {"user_name": "budget_author", "login": "budget_author", "user_role": "author", "password": password}
+    assert client.post("/user/", json=author).status_code == 200
+    session = client.post("/session/", json={"login": "budget_author", "password": password})
+    headers = {"Authorization": f"Bearer {session.headers['x-jwt']}"}
+    news = client.post("/news/", json={"header": "Новость для бюджета запросов", "content": {"blocks": []}}, headers=headers)
+    assert news.status_code == 200
+    news_id = news.json()["news_id"]
+    request = Request({"type": "http", "method": "GET", "headers": [], "query_string": b""})
+    try:
+        for i in range(5):
+            comment = client.post("/comment/", json={"text": f"Комментарий {i}", "news_id": news_id}, headers=headers)
+            assert comment.status_code == 200
+        # сервисы вызываются в процессе теста; кэш ответов сброшен, чтобы запросы шли в базу
+        await response_cache.invalidate(news_cache_key(news_id))
+        await response_cache.invalidate_tag(comments_cache_tag(news_id))
+        async with AsyncSessionLocal() as db:
+            with query_budget(1):
+                await NewsService(db).list(20)
+            with query_budget(1):
+                await NewsService(db).get_response(news_id, request)
+            with query_budget(2):
+                await CommentService(db).list_response(news_id, "oldest", 50, None, request)
+    finally:
+        client.delete(f"/news/{news_id}", headers=headers)
+        await close_app_pools()
+
+
+# Тест 8: Частые попытки входа отклоняются с 429 и заголовком Retry-After
+def test_login_rate_limit(client):
+    payload = {"login": f"rate_limit_{uuid.uuid4().hex[:8]}", "password": "Wrong1!pass"}
+    for _ in range(30):
+        response = client.post("/session/", json=payload)
+        if response.status_code == 429:
+            break
+    else:
+        pytest.skip("Лимит попыток входа отключён на сервере")
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+# Тест 9: После изменения пользователя выданный ему JWT-токен перестаёт действовать
+def test_jwt_revoked_after_user_update(client):
+    user_data = {"user_name": "revoke_user", "login": "revoke_test", "password": "StrongPassword123!"}
+    user = client.post("/user/", json=user_data)
+    assert user.status_code == 200
+    user_id = user.json()["user_id"]
+
+    session = client.post("/session/", json={"login": "revoke_test", "password": "StrongPassword123!"})
+    assert session.status_code == 200
+    headers = {"Authorization": f"Bearer {session.headers['x-jwt']}"}
+    assert client.get(f"/user/{user_id}", headers=headers).status_code == 200
+
+    updated = client.put(f"/user/{user_id}", json={**user_data, "user_name": "revoke_user_2"}, headers=headers)
+    assert updated.status_code == 200
+    assert client.get(f"/user/{user_id}", headers=headers).status_code == 401
+
+
+# Тест 10: Когда все исполнители Argon2 заняты дольше таймаута очереди, запрос получает 503 с Retry-After
+@pytest.mark.anyio
+async def test_password_hash_pool_overload():
+    pool = PasswordHashPool(workers=1, executor="thread", queue_timeout=0.1)
+    release = threading.Event()
+    busy = asyncio.create_task(pool.run("hash", release.wait, 5))
+    try:
+        while pool.running == 0:
+            await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as rejected:
+            await pool.run("hash", release.wait, 5)
+        assert rejected.value.status_code == 503
+        assert int(rejected.value.headers["Retry-After"]) >= 1
+        assert pool.stats()["rejected"] == 1
+    finally:
+        release.set()
+        await busy
+    assert pool.stats()["running"] == 0 and pool.stats()["completed"] == 1
+
+
+# Тест 11: Счётчик комментариев новости совпадает с их числом, в том числе после одновременного удаления одного комментария
+def test_comment_count_consistency(client):
+    password = "StrongPassword123!"
+    author = {"user_name": "count_author", "login": "count_author", "user_role": "author", "password": password}
+    assert client.post("/user/", json=author).status_code == 200
+    session = client.post("/session/", json={"login": "count_author", "password": password})
+    headers = {"Authorization": f"Bearer {session.headers['x-jwt']}"}
+    news = client.post("/news/", json={"header": "Новость для проверки счётчика", "content": {"blocks": []}}, headers=headers)
+    assert news.status_code == 200
+    news_id = news.json()["news_id"]
+    try:
+        comment_ids = []
+        for i in range(3):
+            comment = client.post("/comment/", json={"text": f"Комментарий {i}", "news_id": news_id}, headers=headers)
+            assert comment.status_code == 200
+            comment_ids.append(comment.json()["comment_id"])
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            deletes = list(pool.map(lambda _: client.delete(f"/comment/{comment_ids[0]}", headers=headers), range(2)))
+        assert 200 in [response.status_code for response in deletes]
+        assert client.delete(f"/comment/{comment_ids[1]}", headers=headers).status_code == 200
+
+        conn = psycopg2.connect(DATABASE_URL)
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT comment_count, (SELECT COUNT(*) FROM comment WHERE news_id = %s) FROM news WHERE news_id = %s",
+            (news_id, news_id),
+        )
+        comment_count, actual = cur.fetchone()
+        cur.close()
+        conn.close()
+        assert comment_count == actual == 1
+    finally:
+        client.delete(f"/news/{news_id}", headers=headers)
+
+
+# Тест 12: Пакетная загрузка вставляет валидные строки, а невалидные и нарушающие ограничения базы возвращает как ошибки
+def test_bulk_mixed_batch(client):
+    password = "StrongPassword123!"
+    admin = {"user_name": "bulk_admin", "login": "bulk_admin", "user_role": "admin", "password": password}
+    assert client.post("/user/", json=admin).status_code == 200
+    session = client.post("/session/", json={"login": "bulk_admin", "password": password})
+    headers = {"Authorization": f"Bearer {session.headers['x-jwt']}", "Content-Type": "application/x-ndjson"}
+    news = client.post("/news/", json={"header": "Новость для пакетной загрузки", "content": {"blocks": []}}, headers=headers)
+    assert news.status_code == 200
+    news_id = news.json()["news_id"]
+    try:
+        # строка 2 не проходит схему, строка 3 — внешний ключ: пачка откатывается и вставляется по одной строке
+        lines = [
+            {"text": "Первый", "news_id": news_id},
+            {"text": "Без новости"},
+            {"text": "Чужая новость", "news_id": 2_000_000_000},
+            {"text": "Второй", "news_id": news_id},
+        ]
+        response = client.post("/comment/bulk", content="\n".join(map(json.dumps, lines)), headers=headers)
+        assert response.status_code == 200
+        result = response.json()
+        assert result["inserted"] == 2
+        assert result["error_count"] == 2
+        assert sorted(error["line"] for error in result["errors"]) == [2, 3]
+        assert client.get(f"/news/{news_id}").json()["comment_count"] == 2
+
+        # при массовых ошибках в ответе только первые из них, а общее число — в error_count
+        invalid = "\n".join(json.dumps({"text": "Без новости"}) for _ in range(150))
+        response = client.post("/comment/bulk", content=invalid, headers=headers)
+        assert response.status_code == 200
+        result = response.json()
+        assert result["inserted"] == 0
+        assert result["error_count"] == 150
+        assert len(result["errors"]) < 150
+    finally:
+        client.delete(f"/news/{news_id}", headers=headers)
+
+
+# Тест 13: Одновременная запись одного файла идёт через разные временные файлы и оставляет целый файл
+def test_write_atomic_concurrent_temp_files(tmp_path):
+    writers = 4
+    full_path = str(tmp_path / "image.webp")
+    written, renamed = threading.Barrier(writers), threading.Barrier(writers)
+    seen_temp_files = []
+
+    def write(payload: bytes):
+        def writer(file):
+            file.write(payload)
+            # все потоки одновременно держат свои временные файлы, ни один ещё не переименован
+            written.wait()
+            seen_temp_files.append({name for name in os.listdir(tmp_path) if name.endswith(".tmp")})
+            renamed.wait()
+        write_atomic(full_path, writer)
+
+    payloads = [bytes([i]) * 100_000 for i in range(writers)]
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(write, payloads))
+
+    assert all(len(names) == writers for names in seen_temp_files)
+    assert os.listdir(tmp_path) == ["image.webp"]
+    with open(full_path, "rb") as file:
+        assert file.read() in payloads
+
+
+# Тест 14: У представлений одного ресурса в разных кодировках (identity, gzip, br) разные ETag
+def test_etag_per_content_encoding(client):
+    password = "StrongPassword123!"
+    author = {"user_name": "etag_author", "login": "etag_author", "user_role": "author", "password": password}
+    assert client.post("/user/", json=author).status_code == 200
+    session = client.post("/session/", json={"login": "etag_author", "password": password})
+    headers = {"Authorization": f"Bearer {session.headers['x-jwt']}"}
+    # тело больше COMPRESSION_MIN_SIZE, чтобы ответы сжимались
+    content = {"blocks": [{"type": "paragraph", "data": {"text": "Текст новости. " * 200}}]}
+    news = client.post("/news/", json={"header": "Новость для проверки ETag", "content": content}, headers=headers)
+    assert news.status_code == 200
+    news_id = news.json()["news_id"]
+    try:
+        comment = client.post("/comment/", json={"text": "Комментарий. " * 200, "news_id": news_id}, headers=headers)
+        assert comment.status_code == 200
+        # новость отдаётся из кэша ответов, комментарий сжимается CompressionMiddleware
+        for url in (f"/news/{news_id}", f"/comment/{comment.json()['comment_id']}"):
+            etags = {}
+            for accept_encoding in ("identity", "gzip", "br"):
+                response = client.get(url, headers={"Accept-Encoding": accept_encoding})
+                assert response.status_code == 200
+                # без пакета Brotli на сервере br-запрос получает gzip
+                etags[response.headers.get("content-encoding", "identity")] = response.headers["etag"]
+            assert len(etags) >= 2
+            assert len(set(etags.values())) == len(etags)
+
+            # тег сжатого представления подходит к If-None-Match и возвращается в 304 как есть
+            not_modified = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etags["gzip"]})
+            assert not_modified.status_code == 304
+            assert not_modified.headers["etag"] == etags["gzip"]
+    finally:
+        client.delete(f"/news/{news_id}", headers=headers)
+
+
+# Тест 15: Сразу после записи пользователь читает из основной базы; запись без авторизации (вход) никого не закрепляет
+@pytest.mark.anyio
+async def test_read_after_write_goes_to_primary():
+    writer, reader = uuid.uuid4().int % 10**9, uuid.uuid4().int % 10**9
+
+    async def endpoint(scope, receive, send):
+        # так get_jwt_payload сохраняет проверенный payload для middleware
+        if scope["path"] != "/session/":
+            scope.setdefault("state", {})["jwt_payload"] = {"user_id": writer}
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    middleware = ReadYourWritesMiddleware(endpoint)
+    try:
+        await middleware({"type": "http", "method": "POST", "path": "/session/", "headers": []}, receive, send)
+        assert not await is_pinned(writer)
+
+        await middleware({"type": "http", "method": "POST", "path": "/news/", "headers": []}, receive, send)
+        assert await is_pinned(writer)
+        assert not await is_pinned(reader)
+        assert await read_sessionmaker_for({"user_id": writer}) is AsyncSessionLocal
+    finally:
+        await redis_client.delete(pin_key(writer))
+        await close_app_pools()
+
+
+# Тест 16: Одновременные промахи кэша по одному ключу выполняют одну загрузку, остальные получают её результат
+@pytest.mark.anyio
+async def test_cache_fill_single_load():
+    key = f"test:fill:{uuid.uuid4().hex}"
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.1)
+        return CachedResponse(b'{"loaded": true}', {"ETag": '"test-1"'})
+
+    try:
+        first, second = await asyncio.gather(response_cache.fill(key, loader), response_cache.fill(key, loader))
+        assert loads == 1
+        assert first.body == second.body == b'{"loaded": true}'
+    finally:
+        await response_cache.invalidate(key)
+        await close_app_pools()
+
+
+# Тест 17: Просмотры копятся в Redis и пакетом переносятся в базу; ответы 304 просмотрами не считаются и ETag не меняют
+@pytest.mark.anyio
+async def test_view_count_write_behind(client):
+    password = "StrongPassword123!"
+    author = {"user_name": "views_author", "login": "views_author", "user_role": "author", "password": password}
+    assert client.post("/user/", json=author).status_code == 200
+    session = client.post("/session/", json={"login": "views_author", "password": password})
+    headers = {"Authorization": f"Bearer {session.headers['x-jwt']}"}
+    news = client.post("/news/", json={"header": "Новость для подсчёта просмотров", "content": {"blocks": []}}, headers=headers)
+    assert news.status_code == 200
+    news_id = news.json()["news_id"]
+    try:
+        first = client.get(f"/news/{news_id}")
+        assert first.status_code == 200
+        assert client.get(f"/news/{news_id}").status_code == 200
+        assert client.get(f"/news/{news_id}", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+        # перенос может выполнять и фоновая задача сервера, поэтому он повторяется, пока просмотры не окажутся в базе
+        for _ in range(50):
+            await view_counter.flush()
+            views = client.get(f"/news/{news_id}/views").json()["view_count"]
+            if views >= 2:
+                break
+            await asyncio.sleep(0.2)
+        assert views == 2
+        assert await redis_client.hget(PENDING_KEY, str(news_id)) is None
+        assert await redis_client.hget(FLUSHING_KEY, str(news_id)) is None
+        # перенос просмотров не меняет версию новости
+        assert client.get(f"/news/{news_id}", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    finally:
+        client.delete(f"/news/{news_id}", headers=headers)
+        await close_app_pools()
@@ -115,12 +115,20 @@ const logoutAndRedirect = () => {
 // экспорт методов для работы с API
 
 export const newsAPI = {
-    // получение списка новостей
-    getNewsList: () => api.get('/news/'),
+    // получение страницы ленты новостей, всех или одного автора (cursor — next_cursor предыдущей страницы)
+    getNewsList: (cursor = null, authorId = null) => api.get('/news/', {
+        params: { ...(cursor ? { cursor } : {}), ...(authorId ? { author_id: authorId } : {}) },
+    }),
+    // полнотекстовый поиск новостей (cursor — next_cursor предыдущей страницы)
+    searchNews: (q, cursor = null) => api.get('/news/search', { params: cursor ? { q, cursor } : { q } }),
     // получение одной новости по ID
     getNewsById: (id) => api.get(`/news/${id}`),
-    // получение комментариев к новости
-    getCommentsByNews: (newsId) => api.get(`/comment/news/${newsId}`),
+    // получение числа просмотров новости
+    getNewsViews: (id) => api.get(`/news/${id}/views`),
+    // получение страницы комментариев к новости (cursor — next_cursor предыдущей страницы)
+    getCommentsByNews: (newsId, cursor = null) => api.get(`/comment/news/${newsId}`, {
+        params: { order: 'newest', ...(cursor ? { cursor } : {}) },
+    }),
     // создание новости
     createNews: (newsData) => api.post('/news/', newsData),
     // обновление новости
@@ -160,15 +168,31 @@ export const userAPI = {
     deleteUser: (userId) => api.delete(`/user/${userId}`),
 };
 
+export const adminAPI = {
+    // общее число пользователей, новостей и комментариев (для админа)
+    getStats: () => api.get('/admin/stats'),
+};
+
 export const commentAPI = {
     // создание комментария
     createComment: (commentData) => api.post('/comment/', commentData),
-    // получение комментариев к новости
-    getCommentsByNews: (newsId) => api.get(`/comment/news/${newsId}`),
+    // получение страницы комментариев к новости (cursor — next_cursor предыдущей страницы)
+    getCommentsByNews: (newsId, cursor = null) => api.get(`/comment/news/${newsId}`, {
+        params: cursor ? { cursor } : {},
+    }),
     // обновление комментария
     updateComment: (id, commentData) => api.put(`/comment/${id}`, commentData),
     // удаление комментария
     deleteComment: (id) => api.delete(`/comment/${id}`),
 };
 
+export const mediaAPI = {
+    // загрузка изображения (возвращает path для полей cover/avatar и URL вариантов)
+    upload: (file) => {
+        const formData = new FormData();
+        formData.append('file', file);
+        return api.post('/media/', formData, { headers: { 'Content-Type': 'multipart/form-data' } });
+    },
+};
+
 export default api;
\ No newline at end of file
@@ -40,8 +40,9 @@ function CommentCard({comment, currentUser, onDelete, onEdit}) {
         }
     };
 
-	const getAvatarUrl = (avatar) => {
+	const getAvatarUrl = (avatar, variants) => {
         if (!avatar) return null;
+        if (variants) return `http://localhost:8000${variants.thumbnail.jpeg}`;
         if (avatar.startsWith('http')) return avatar;
         return `http://localhost:8000/static/${avatar}`;
     };
@@ -51,7 +52,7 @@ function CommentCard({comment, currentUser, onDelete, onEdit}) {
 	    	<div className="comment-meta">
 	    		<div className="author-info">
 	    			<Avatar
-                        src={getAvatarUrl(comment.author?.avatar)}
+                        src={getAvatarUrl(comment.author?.avatar, comment.author?.avatar_variants)}
                         alt={comment.author?.user_name || 'Автор'}
                         size="small"
                         className="author-avatar"
@@ -26,18 +26,34 @@ function NewsCard({ news, showCover = true, showPreview = true, goAhead = true }
                 <span className="author">
                     👤 Автор: {news.author.user_name}
                 </span>
+                <span className="comments">
+                    💬 {news.comment_count}
+                </span>
+                <span className="views">
+                    👁 {news.view_count}
+                </span>
             </div>
 
             {showCover && news.cover && (
                 <div className="cover-container">
-                    <img 
-                        src={`http://localhost:8000/static/${news.cover}`}
-                        alt={news.header}
-                        className="news-cover"
-                        onError={(e) => {
-                            e.target.style.display = 'none';
-                        }}
-                    />
+                    <picture>
+                        {news.cover_variants && (
+                            <source
+                                type="image/webp"
+                                srcSet={`http://localhost:8000${news.cover_variants.card.webp}`}
+                            />
+                        )}
+                        <img 
+                            src={news.cover_variants
+                                ? `http://localhost:8000${news.cover_variants.card.jpeg}`
+                                : `http://localhost:8000/static/${news.cover}`}
+                            alt={news.header}
+                            className="news-cover"
+                            onError={(e) => {
+                                e.target.style.display = 'none';
+                            }}
+                        />
+                    </picture>
                 </div>
             )}
 
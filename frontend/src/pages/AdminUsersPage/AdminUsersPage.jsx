@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { userAPI, newsAPI, commentAPI } from '../../api/index.js';
+import { userAPI, adminAPI } from '../../api/index.js';
 import './AdminUsersPage.css';
 
 function AdminUsersPage() {
@@ -14,17 +14,9 @@ function AdminUsersPage() {
             try {
                 setLoading(true);
                 setError('');
-                const usersRes = await userAPI.getAllUsers();
+                const [usersRes, statsRes] = await Promise.all([userAPI.getAllUsers(), adminAPI.getStats()]);
                 setUsers(usersRes.data);
-                const newsRes = await newsAPI.getNewsList();
-                const commentsArr = await Promise.all(
-                  newsRes.data.map(news => commentAPI.getCommentsByNews(news.news_id))
-                );
-                setStats({
-                    users: usersRes.data.length,
-                    news: newsRes.data.length,
-                    comments: commentsArr.reduce((acc, res) => acc + res.data.length, 0)
-                });
+                setStats(statsRes.data);
             } catch (e) {
                 setError('Не удалось загрузить пользователей или статистику');
             } finally {
@@ -41,7 +33,9 @@ function AdminUsersPage() {
             setUsers(users => users.filter(u => u.user_id !== userId));
             setStats(s => ({ ...s, users: s.users - 1 }));
         } catch (e) {
-            alert('Ошибка удаления пользователя');
+            alert(e.response?.status === 409
+                ? 'Нельзя удалить пользователя, у которого есть новости или комментарии'
+                : 'Ошибка удаления пользователя');
         }
     };
 
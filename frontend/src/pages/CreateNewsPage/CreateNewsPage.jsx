@@ -1,6 +1,6 @@
 ﻿import React, { useState, useEffect } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
-import { newsAPI } from '../../api/index.js';
+import { newsAPI, mediaAPI } from '../../api/index.js';
 import { convertTextToEditorJs } from '../../utils/convertTextToEditorJs.js'
 import './CreateNewsPage.css';
 
@@ -9,6 +9,7 @@ function CreateNewsPage() {
     const [content, setContent] = useState('');
     const [cover, setCover] = useState('');
     const [loading, setLoading] = useState(false);
+    const [uploading, setUploading] = useState(false);
     const [error, setError] = useState('');
     const [currentUser, setCurrentUser] = useState(null);
     const [hasPermission, setHasPermission] = useState(true);
@@ -42,6 +43,23 @@ function CreateNewsPage() {
         }
     }, []);
 
+    // загрузка файла обложки на сервер
+    const handleCoverUpload = async (e) => {
+        const file = e.target.files[0];
+        if (!file) return;
+        setUploading(true);
+        setError('');
+        try {
+            const response = await mediaAPI.upload(file);
+            setCover(response.data.path);
+        } catch (err) {
+            console.error('Ошибка загрузки обложки:', err);
+            setError('Не удалось загрузить изображение');
+        } finally {
+            setUploading(false);
+        }
+    };
+
     const handleSubmit = async (e) => {
         e.preventDefault();
         setError('');
@@ -150,6 +168,12 @@ function CreateNewsPage() {
                         placeholder="Введите URL изображения (опционально)"
                         disabled={loading}
                     />
+                    <input
+                        type="file"
+                        accept="image/jpeg,image/png,image/webp,image/gif"
+                        onChange={handleCoverUpload}
+                        disabled={loading || uploading}
+                    />
                 </div>
 
                 {error && <div className="error-message">{error}</div>}
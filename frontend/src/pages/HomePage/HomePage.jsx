@@ -5,14 +5,23 @@ import './HomePage.css';
 
 function HomePage() {
     const [news, setNews] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [query, setQuery] = useState('');
+    const [searchQuery, setSearchQuery] = useState('');
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
 
+    // страница ленты или результатов поиска
+    const fetchPage = (cursor = null) => (
+        searchQuery ? newsAPI.searchNews(searchQuery, cursor) : newsAPI.getNewsList(cursor)
+    );
+
     useEffect(() => {
         const fetchNews = async () => {
             try {
-                const response = await newsAPI.getNewsList();
-                setNews(response.data);
+                const response = await fetchPage();
+                setNews(response.data.items);
+                setNextCursor(response.data.next_cursor);
                 setLoading(false);
             } catch (err) {
                 console.error('Ошибка загрузки новостей:', err);
@@ -22,7 +31,24 @@ function HomePage() {
         };
 
         fetchNews();
-    }, []);
+    }, [searchQuery]);
+
+    // обработчик поиска
+    const handleSearch = (e) => {
+        e.preventDefault();
+        setSearchQuery(query.trim());
+    };
+
+    // загрузка следующей страницы ленты
+    const loadMore = async () => {
+        try {
+            const response = await fetchPage(nextCursor);
+            setNews(prev => [...prev, ...response.data.items]);
+            setNextCursor(response.data.next_cursor);
+        } catch (err) {
+            console.error('Ошибка загрузки новостей:', err);
+        }
+    };
 
     if (loading) {
         return (
@@ -53,10 +79,22 @@ function HomePage() {
     return (
         <div className="home-container">
             <h1>Новости</h1>
+            <form onSubmit={handleSearch} className="search-form">
+                <input
+                    type="search"
+                    value={query}
+                    onChange={(e) => setQuery(e.target.value)}
+                    placeholder="Поиск по новостям"
+                    className="search-input"
+                />
+                <button type="submit" className="retry-btn">
+                    Найти
+                </button>
+            </form>
             <div className="news-list">
                 {news.length === 0 ? (
                     <div className="no-news">
-                        <p>Новостей пока нет. Будьте первым, кто добавит новость!</p>
+                        <p>{searchQuery ? 'По вашему запросу ничего не найдено' : 'Новостей пока нет. Будьте первым, кто добавит новость!'}</p>
                     </div>
                 ) : (
                     news.map((item) => (
@@ -70,6 +108,11 @@ function HomePage() {
                     ))
                 )}
             </div>
+            {nextCursor && (
+                <button onClick={loadMore} className="retry-btn">
+                    Загрузить ещё
+                </button>
+            )}
         </div>
     );
 }
@@ -12,6 +12,7 @@ function NewsPage() {
     const navigate = useNavigate();
     const [news, setNews] = useState(null);
     const [comments, setComments] = useState([]);
+    const [commentsCursor, setCommentsCursor] = useState(null);
     const [loading, setLoading] = useState(true);
     const [commentLoading, setCommentLoading] = useState(false);
     const [error, setError] = useState(null);
@@ -34,15 +35,21 @@ function NewsPage() {
         const fetchNewsData = async () => {
             try {
                 setLoading(true);
-                const newsResponse = await newsAPI.getNewsById(id);
-                setNews(newsResponse.data);
+                // число просмотров не входит в ответ новости (иначе менялся бы её ETag) и запрашивается отдельно
+                const [newsResponse, viewsResponse] = await Promise.all([
+                    newsAPI.getNewsById(id),
+                    newsAPI.getNewsViews(id),
+                ]);
+                setNews({ ...newsResponse.data, view_count: viewsResponse.data.view_count });
                 
                 try {
                     const commentsResponse = await newsAPI.getCommentsByNews(id);
-                    setComments(commentsResponse.data);
+                    setComments(commentsResponse.data.items);
+                    setCommentsCursor(commentsResponse.data.next_cursor);
                 } catch (commentErr) {
                     console.warn('Не удалось загрузить комментарии:', commentErr);
                     setComments([]);
+                    setCommentsCursor(null);
                 }
                 
                 setLoading(false);
@@ -56,6 +63,17 @@ function NewsPage() {
         fetchNewsData();
     }, [id]);
 
+    // загрузка следующей страницы комментариев
+    const loadMoreComments = async () => {
+        try {
+            const response = await newsAPI.getCommentsByNews(id, commentsCursor);
+            setComments(prev => [...prev, ...response.data.items]);
+            setCommentsCursor(response.data.next_cursor);
+        } catch (err) {
+            console.error('Ошибка загрузки комментариев:', err);
+        }
+    };
+
     // обработчик добавления комментария
     const handleAddComment = async (text) => {
         if (!currentUser) {
@@ -72,6 +90,7 @@ function NewsPage() {
             
             // добавляем новый комментарий в начало списка
             setComments([response.data, ...comments]);
+            setNews(prev => ({ ...prev, comment_count: prev.comment_count + 1 }));
         } catch (err) {
             console.error('Ошибка при создании комментария:', err);
             
@@ -125,6 +144,7 @@ function NewsPage() {
             
             // удаление комментария из списка
             setComments(comments.filter(comment => comment.comment_id !== commentId));
+            setNews(prev => ({ ...prev, comment_count: prev.comment_count - 1 }));
         } catch (err) {
             console.error('Ошибка при удалении комментария:', err);
             
@@ -248,7 +268,7 @@ function NewsPage() {
             </div>
             
             <div className="comments-section">
-                <h2>Комментарии ({comments.length})</h2>
+                <h2>Комментарии ({news.comment_count})</h2>
                 
                 <CommentForm 
                     onSubmit={handleAddComment}
@@ -273,6 +293,11 @@ function NewsPage() {
                         ))}
                     </div>
                 )}
+                {commentsCursor && (
+                    <button onClick={loadMoreComments} className="retry-btn">
+                        Загрузить ещё
+                    </button>
+                )}
             </div>
         </div>
     );
@@ -1,7 +1,8 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
-import { userAPI } from '../../api/index.js';
+import { userAPI, newsAPI } from '../../api/index.js';
 import Avatar from '../../../src/components/Avatar/Avatar.jsx';
+import NewsCard from '../../components/NewsCard/NewsCard.jsx';
 import './UserProfilePage.css';
 
 function UserProfilePage() {
@@ -15,6 +16,8 @@ function UserProfilePage() {
     const [isEditing, setIsEditing] = useState(false);
     const [loadingSave, setLoadingSave] = useState(false);
     const [deletingAccount, setDeletingAccount] = useState(false);
+    const [authorNews, setAuthorNews] = useState([]);
+    const [authorNewsCursor, setAuthorNewsCursor] = useState(null);
     
     // форма редактирования
     const [formData, setFormData] = useState({
@@ -101,6 +104,34 @@ function UserProfilePage() {
         fetchUser();
     }, [userId, navigate]);
 
+    // загрузка новостей автора
+    useEffect(() => {
+        if (!user || user.user_role === 'user') return;
+        const fetchAuthorNews = async () => {
+            try {
+                const response = await newsAPI.getNewsList(null, user.user_id);
+                setAuthorNews(response.data.items);
+                setAuthorNewsCursor(response.data.next_cursor);
+            } catch (err) {
+                // 404 — у автора пока нет новостей
+                setAuthorNews([]);
+                setAuthorNewsCursor(null);
+            }
+        };
+        fetchAuthorNews();
+    }, [user?.user_id, user?.user_role]);
+
+    // загрузка следующей страницы новостей автора
+    const loadMoreAuthorNews = async () => {
+        try {
+            const response = await newsAPI.getNewsList(authorNewsCursor, user.user_id);
+            setAuthorNews(prev => [...prev, ...response.data.items]);
+            setAuthorNewsCursor(response.data.next_cursor);
+        } catch (err) {
+            console.error('Ошибка загрузки новостей автора:', err);
+        }
+    };
+
     const canEdit = currentUser && user && (
         currentUser.user_id === user.user_id || 
         currentUser.user_role === 'admin'
@@ -299,6 +330,8 @@ function UserProfilePage() {
                 setError('У вас нет прав для удаления этого аккаунта');
             } else if (err.response?.status === 404) {
                 setError('Пользователь не найден');
+            } else if (err.response?.status === 409) {
+                setError('Нельзя удалить аккаунт, у которого есть новости или комментарии');
             } else {
                 setError('Не удалось удалить аккаунт. Попробуйте еще раз.');
             }
@@ -518,6 +551,26 @@ function UserProfilePage() {
                     </div>
                 </form>
             )}
+
+            {authorNews.length > 0 && (
+                <div className="author-news">
+                    <h2>Новости автора</h2>
+                    {authorNews.map((item) => (
+                        <NewsCard
+                            key={item.news_id}
+                            news={item}
+                            showCover={false}
+                            showPreview={true}
+                            goAhead={true}
+                        />
+                    ))}
+                    {authorNewsCursor && (
+                        <button onClick={loadMoreAuthorNews} className="edit-btn">
+                            Загрузить ещё
+                        </button>
+                    )}
+                </div>
+            )}
         </div>
     );
 }